@@ -1,34 +1,39 @@
 import streamlit as st
-import pandas as pd
 import sys
 import os 
 
 from database.db import connect_database
-from models.schema import create_users_table
+from models.schema import create_users_table, create_user_preferences_table
 from pathlib import Path
 
 # Initialize database with users table only (not from CSV for login)
-conn = None
-try:
+@st.cache_resource
+def init_database():
+    # Once per server process, not on every rerun
     conn = connect_database()
-    cursor = conn.cursor()
-    
-    # Create users table with proper structure for login
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT NOT NULL UNIQUE,
-            password_hash TEXT NOT NULL,
-            role TEXT DEFAULT 'user'
-        )
-    """)
-    conn.commit()
+    try:
+        cursor = conn.cursor()
+        
+        # Create users table with proper structure for login
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT NOT NULL UNIQUE,
+                password_hash TEXT NOT NULL,
+                role TEXT DEFAULT 'user'
+            )
+        """)
+        conn.commit()
+        create_user_preferences_table(conn)
+    finally:
+        conn.close()
+
+
+try:
+    init_database()
 except Exception as e:
     st.exception(f"FATAL: Database initialization failed during table creation.")
     st.stop()
-finally:
-    if conn:
-        conn.close()
 
 
 current_dir = os.path.dirname(__file__)
@@ -37,8 +42,11 @@ if project_root not in sys.path:
     sys.path.append(project_root)
 
 from services.user_service import login_user, register_user
-from services.auth_manager import auth_manager
-from services.ai_assistant import AIAssistant
+from services.snapshot_worker import latest_snapshot
+from services.auth_manager import AuthConfigError
+from services.rate_limiter import client_address, parse_networks
+import config
+from components.session_guard import current_session, start_session, end_session
 
 
 st.set_page_config(
@@ -61,6 +69,20 @@ if "token" not in st.session_state:
     st.session_state.token = ""
 
 
+TRUSTED_PROXIES = parse_networks(config.LOGIN_TRUSTED_PROXIES)
+
+
+def get_client_id():
+    # Client address for the login rate limiter, None if Streamlit can't tell.
+    # Behind a load balancer ip_address is the proxy's, so the forwarded
+    # address is used, but only when the proxy is configured as trusted.
+    return client_address(
+        getattr(st.context, "ip_address", None),
+        st.context.headers.get("X-Forwarded-For", ""),
+        TRUSTED_PROXIES
+    )
+
+
 def login_page():
     col1, col2, col3 = st.columns([1, 2, 1])
     
@@ -95,21 +117,19 @@ def login_page():
                     if not username or not password:
                         st.error("Username and password are required")
                     else:
-                        success, message = login_user(username, password)
+                        success, result = login_user(username, password, client=get_client_id())
                         
                         if success:
-                            # Generate JWT token
-                            user_id = 1  # In real app, get from database
-                            token = auth_manager.generate_token(user_id, username, message)
-                            
-                            st.session_state.logged_in = True
-                            st.session_state.username = username
-                            st.session_state.role = message
-                            st.session_state.token = token
+                            # Issue the access and refresh tokens for the user record
+                            try:
+                                start_session(result)
+                            except AuthConfigError as e:
+                                st.error(f"{e}")
+                                st.stop()
                             st.success(f"Login successful! Welcome, {username}!")
                             st.rerun()
                         else:
-                            st.error(f"{message}")
+                            st.error(f"{result}")
             
             st.markdown("---")
             st.markdown("Don't have an account? Switch to Register tab ->")
@@ -182,23 +202,28 @@ def dashboard_page():
         st.divider()
         
         if st.button("Logout", use_container_width=True):
-            st.session_state.logged_in = False
-            st.session_state.username = ""
-            st.session_state.role = ""
+            end_session()
             st.rerun()
     
     st.title("Multi-Domain Intelligence Platform")
     
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        st.metric("Total Users", "1,000", "+50")
+    snapshot = latest_snapshot()
     
-    with col2:
-        st.metric("Incidents", "156", "-12")
+    col1, col2, col3 = st.columns(3)
     
-    with col3:
-        st.metric("IT Tickets", "342", "+18")
+    if snapshot:
+        with col1:
+            st.metric("Total Users", f"{snapshot.counts['users']:,}")
+        
+        with col2:
+            st.metric("Incidents", f"{snapshot.counts['cyber_incidents']:,}")
+        
+        with col3:
+            st.metric("IT Tickets", f"{snapshot.counts['it_tickets']:,}")
+        
+        st.caption(f"Snapshot updated {snapshot.describe_age()}")
+    else:
+        st.info("Open the Dashboard page once to initialise the data tables")
     
     st.divider()
     
@@ -228,6 +253,7 @@ def dashboard_page():
         "Status": ["Success", "Success", "Pending"]
     }
     
+    import pandas as pd
     df = pd.DataFrame(sample_data)
     st.dataframe(df, use_container_width=True)
     
@@ -282,7 +308,7 @@ def dashboard_page():
 
 
 def main():
-    if st.session_state.logged_in:
+    if current_session() is not None:
         dashboard_page()
     else:
         login_page()
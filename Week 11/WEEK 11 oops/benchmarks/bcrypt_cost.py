@@ -0,0 +1,41 @@
+# bcrypt Cost Benchmark
+# Reports verifications per second for each bcrypt cost on this machine and
+# recommends a BCRYPT_ROUNDS value for the target login verify time.
+#
+# Usage (from the project folder):
+#   python benchmarks/bcrypt_cost.py
+#   python benchmarks/bcrypt_cost.py --target-ms 300 --min-rounds 10 --max-rounds 14
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config
+from services.passwords import benchmark, calibrate_rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="bcrypt cost calibration")
+    parser.add_argument("--target-ms", type=float, default=config.BCRYPT_TARGET_VERIFY_MS,
+                        help="Target time for one password verification")
+    parser.add_argument("--min-rounds", type=int, default=10)
+    parser.add_argument("--max-rounds", type=int, default=14)
+    parser.add_argument("--samples", type=int, default=3)
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    print(f"{'Cost':>4}  {'ms/verify':>10}  {'verifies/s/core':>16}  {'verifies/s total':>17}")
+    for rounds, per_second in benchmark(range(args.min_rounds, args.max_rounds + 1), args.samples).items():
+        print(f"{rounds:>4}  {1000 / per_second:>10.1f}  {per_second:>16.1f}  {per_second * cores:>17.1f}")
+
+    recommended = calibrate_rounds(args.target_ms, args.min_rounds, args.max_rounds)
+    print(f"\n Current BCRYPT_ROUNDS: {config.BCRYPT_ROUNDS}")
+    print(f" Recommended for {args.target_ms:.0f} ms: BCRYPT_ROUNDS={recommended}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+# Import Time Benchmark
+# Checks the cold-start import cost of the modules Home.py loads before the
+# first render, using `python -X importtime`.
+#
+# Usage (from the project folder):
+#   python benchmarks/import_time.py
+#   python benchmarks/import_time.py --budget-ms 150 --runs 7
+#
+# Exits with status 1 if the median import time goes over the budget, or if
+# one of the heavy libraries below gets imported eagerly again, either by
+# the start-up modules or at the top level of a page script.
+
+import argparse
+import ast
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Modules on the start-up path of Home.py (streamlit itself is not ours to budget)
+STARTUP_MODULES = [
+    "database.db",
+    "models.schema",
+    "models.users",
+    "services.user_service",
+    "services.auth_manager",
+    "services.ai_assistant",
+    "services.passwords",
+    "services.snapshot_worker",
+    "components.session_guard",
+]
+
+# Imported before the measured modules and left out of the results, as the
+# pages import streamlit anyway (and it loads plotly itself)
+PRELOADED_MODULES = ["streamlit"]
+
+# Heavy dependencies that must only be imported at the point of use
+LAZY_MODULES = ["openai", "plotly", "pandas", "bcrypt", "jwt"]
+
+# Page scripts render as they are imported, so they are checked statically
+PAGE_SCRIPTS = [PROJECT_ROOT / "Home.py", *sorted((PROJECT_ROOT / "pages").glob("*.py"))]
+
+DEFAULT_BUDGET_MS = 100.0
+
+
+def measure_once(modules):
+    """Import the modules in a fresh interpreter and parse the importtime log.
+
+    Returns (total_ms, imported_names), leaving out PRELOADED_MODULES and
+    everything they import."""
+    code = "; ".join(f"import {name}" for name in PRELOADED_MODULES + list(modules))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Import failed:\n{result.stderr}")
+
+    total_us = 0
+    imported = set()
+    preloading = set(PRELOADED_MODULES)
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, package = line.split("|")
+        name = package.rstrip()
+        if preloading:
+            # A package is logged after everything it imported
+            if not name.startswith("  "):
+                preloading.discard(name.strip())
+            continue
+        imported.add(name.strip())
+        # Only top-level entries (no indentation) add to the total
+        if not name.startswith("  "):
+            total_us += int(cumulative.strip())
+    return total_us / 1000, imported
+
+
+def run_benchmark(modules=STARTUP_MODULES, runs=5):
+    """Run the measurement several times and return (median_ms, eager_heavy_modules)."""
+    timings = []
+    eager = set()
+    for _ in range(runs):
+        total_ms, imported = measure_once(modules)
+        timings.append(total_ms)
+        eager.update(
+            name for name in imported
+            if name.split(".")[0] in LAZY_MODULES
+        )
+    return statistics.median(timings), sorted({name.split(".")[0] for name in eager})
+
+
+def _top_level_imports(node):
+    # Everything that runs when the script runs, function bodies excluded
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            continue
+        if isinstance(child, ast.Import):
+            yield from (alias.name for alias in child.names)
+        elif isinstance(child, ast.ImportFrom) and child.module and not child.level:
+            yield child.module
+        yield from _top_level_imports(child)
+
+
+def eager_page_imports(scripts=PAGE_SCRIPTS):
+    """Return ["page: module"] for each heavy module a page script imports at the top level"""
+    found = []
+    for script in scripts:
+        tree = ast.parse(script.read_text(encoding="utf-8"), filename=str(script))
+        for name in _top_level_imports(tree):
+            if name.split(".")[0] in LAZY_MODULES:
+                found.append(f"{script.relative_to(PROJECT_ROOT).as_posix()}: {name}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start import time budget check")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="Maximum allowed median import time in milliseconds")
+    parser.add_argument("--runs", type=int, default=5,
+                        help="Number of fresh interpreter runs")
+    args = parser.parse_args()
+
+    median_ms, eager = run_benchmark(runs=args.runs)
+    print(f"Start-up imports: {median_ms:.1f} ms (median of {args.runs}, budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    if eager:
+        print(f" Heavy modules imported eagerly: {', '.join(eager)}")
+        failed = True
+    for found in eager_page_imports():
+        print(f" Heavy module imported at the top of a page: {found}")
+        failed = True
+    if median_ms > args.budget_ms:
+        print(f" Import time regression: {median_ms:.1f} ms > {args.budget_ms:.0f} ms")
+        failed = True
+
+    if not failed:
+        print(" Import budget OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+# Entity Picker Component
+# Typeahead replacement for selectboxes listing every ID: the user types an
+# ID or title prefix and only the first few matches are sent to the browser.
+
+import streamlit as st
+from services.data_cache import search_entries
+
+DEFAULT_MATCH_LIMIT = 20
+
+
+def entity_picker(label, key, domain=None, limit=DEFAULT_MATCH_LIMIT):
+    """Render a search box plus a short selectbox of matching entries.
+
+    Returns the selected entry ID (e.g. 'INC-12') or None if nothing matches.
+    Must be used outside st.form so that typing re-runs the search."""
+    query = st.text_input(
+        f"Search {label}",
+        key=f"{key}_search",
+        placeholder="Type an ID (e.g. 12 or INC-12) or the start of a title"
+    )
+    matches = search_entries(query, domain=domain, limit=limit)
+
+    if matches.empty:
+        st.caption("No matching entries")
+        return None
+
+    titles = dict(zip(matches['entry_id'], matches['title']))
+    return st.selectbox(
+        label,
+        list(titles),
+        format_func=lambda entry_id: f"{entry_id} - {titles[entry_id]}",
+        key=key
+    )
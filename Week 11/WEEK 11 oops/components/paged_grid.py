@@ -0,0 +1,63 @@
+# Paged Grid Component
+# Shows one page of a table at a time. Sorting, the prefix filter and
+# LIMIT/OFFSET all run in SQL, so the data sent to the browser is bounded by
+# the user's "Data Display Rows" setting rather than by the table size.
+
+import streamlit as st
+from services.preferences import get_preference
+from services.data_cache import get_table_columns, count_rows, get_rows_page
+
+PAGE_SIZES = [10, 25, 50, 100]
+DEFAULT_PAGE_SIZE = 25
+NO_SORT = "(default)"
+
+
+def get_page_size():
+    """Rows per page for the logged in user (from the session preferences)"""
+    page_size = get_preference("page_size")
+    return page_size if page_size in PAGE_SIZES else DEFAULT_PAGE_SIZE
+
+
+def paged_grid(table, key, sort_by=None, descending=False):
+    """Render filter/sort/page controls and one page of `table` (or view)"""
+    columns = get_table_columns(table)
+    page_size = get_page_size()
+
+    col1, col2, col3, col4 = st.columns([2, 2, 2, 1])
+    with col1:
+        filter_column = st.selectbox("Filter column", columns, key=f"{key}_filter_column")
+    with col2:
+        filter_value = st.text_input("Starts with", key=f"{key}_filter_value")
+    with col3:
+        sort_options = [NO_SORT] + columns
+        sort_choice = st.selectbox(
+            "Sort by",
+            sort_options,
+            index=sort_options.index(sort_by) if sort_by is not None and sort_by in columns else 0,
+            key=f"{key}_sort_by"
+        )
+    with col4:
+        descending = st.checkbox("Descending", value=descending, key=f"{key}_descending")
+
+    sort_column = None if sort_choice == NO_SORT else sort_choice
+    total = count_rows(table, filter_column, filter_value)
+    total_pages = max(1, (total + page_size - 1) // page_size)
+
+    page = st.number_input(
+        f"Page (of {total_pages})",
+        min_value=1,
+        value=1,
+        step=1,
+        key=f"{key}_page"
+    )
+    page = min(int(page), total_pages)
+    offset = (page - 1) * page_size
+
+    df = get_rows_page(
+        table, offset, page_size, sort_column, descending, filter_column, filter_value
+    )
+    st.dataframe(df, use_container_width=True, hide_index=True)
+    if total:
+        st.caption(f"Rows {offset + 1}-{offset + len(df)} of {total}")
+    else:
+        st.caption("No rows")
@@ -0,0 +1,182 @@
+# Session Guard Component
+# Every page calls require_login() before drawing anything. It checks the
+# session's JWT with auth_manager.verify_token (cached until the token's exp),
+# so an expired or tampered token ends the session instead of the page
+# trusting st.session_state.logged_in on its own. Ending a session revokes
+# its tokens.
+#
+# A browser reload starts a new, empty session_state. To avoid sending the
+# user back through login (and bcrypt), the session's refresh token is kept
+# on the server (the session_resume table) under a random resume id, and
+# only that opaque id goes to the browser, as a query param
+# (config.SESSION_RESUME_PARAM). Streamlit can't set HttpOnly cookies, and
+# the token is not handed to page scripts. A new session that finds an id
+# exchanges it for fresh tokens. Ids are single use and replaced whenever
+# the refresh token rotates (once it is past half its lifetime), so an id
+# left in history or a Referer header stops working once the session has
+# moved on. Logging out deletes it.
+
+import hashlib
+import secrets
+import time
+
+import streamlit as st
+import config
+from database.db import connect_database
+from models.schema import create_session_resume_table
+from models.sessions import save_resume_session, take_resume_session, delete_resume_session
+from services.auth_manager import auth_manager
+from services.preferences import load_preferences, clear_preferences
+from services.user_service import get_user_record
+
+
+@st.cache_resource
+def _init_resume_table():
+    # Once per server process, not on every rerun
+    conn = connect_database()
+    create_session_resume_table(conn)
+    conn.close()
+
+
+def _hash_id(resume_id):
+    return hashlib.sha256(resume_id.encode()).hexdigest()
+
+
+def _forget_resume_id():
+    resume_id = st.session_state.pop("resume_id", None)
+    if resume_id:
+        delete_resume_session(_hash_id(resume_id))
+
+
+def _set_resume_token(refresh_token):
+    """Keep the refresh token on the server under a new resume id, and the id in the URL"""
+    if st.session_state.get("resume_refresh_token") != refresh_token:
+        _init_resume_table()
+        _forget_resume_id()
+        resume_id = secrets.token_urlsafe(32)
+        save_resume_session(_hash_id(resume_id), refresh_token,
+                            time.time() + config.SESSION_RESUME_MINUTES * 60)
+        st.session_state.resume_id = resume_id
+        st.session_state.resume_refresh_token = refresh_token
+    # Switching pages drops the query params, so every page puts it back
+    if st.query_params.get(config.SESSION_RESUME_PARAM) != st.session_state.resume_id:
+        st.query_params[config.SESSION_RESUME_PARAM] = st.session_state.resume_id
+
+
+def _clear_resume_token():
+    _forget_resume_id()
+    st.session_state.pop("resume_refresh_token", None)
+    st.query_params.pop(config.SESSION_RESUME_PARAM, None)
+
+
+def _revoke_session_tokens():
+    for name in ("token", "refresh_token"):
+        token = st.session_state.get(name)
+        if token:
+            auth_manager.revoke_token(token)
+
+
+def _fill_session(token, refresh_token, user):
+    st.session_state.logged_in = True
+    st.session_state.user = user
+    st.session_state.username = user.username
+    st.session_state.role = user.role
+    st.session_state.token = token
+    st.session_state.refresh_token = refresh_token
+    _set_resume_token(refresh_token)
+
+
+def start_session(user):
+    """Log a user (UserRecord) in after their password was checked, replacing any tokens the session had"""
+    _revoke_session_tokens()
+    _fill_session(
+        auth_manager.generate_token(user.id, user.username, user.role),
+        auth_manager.generate_refresh_token(user.id, user.username, user.role),
+        user
+    )
+    load_preferences(user.id)
+
+
+def end_session():
+    """Revoke the session's tokens and clear the login from session_state"""
+    _revoke_session_tokens()
+    _clear_resume_token()
+    st.session_state.logged_in = False
+    st.session_state.user = None
+    st.session_state.username = ""
+    st.session_state.role = ""
+    st.session_state.token = ""
+    st.session_state.refresh_token = ""
+    clear_preferences()
+
+
+def _resume_session():
+    """Restore a login from the resume id in the URL, True if it worked"""
+    # Only a new session (a reload) has anything to resume from
+    if st.session_state.get("resume_checked"):
+        return False
+    st.session_state.resume_checked = True
+    resume_id = st.query_params.get(config.SESSION_RESUME_PARAM)
+    if not resume_id:
+        return False
+    _init_resume_table()
+    refresh_token = take_resume_session(_hash_id(resume_id))
+    tokens = auth_manager.resume_session(refresh_token) if refresh_token else None
+    if tokens is None:
+        _clear_resume_token()
+        return False
+    # One lookup per resumed session, by id so a deleted account (or a
+    # new account that took a renamed user's old name) can't be resumed
+    claims = auth_manager.get_user_from_token(tokens[0])
+    user = get_user_record(claims['user_id']) if claims is not None else None
+    if user is None:
+        for token in tokens:
+            auth_manager.revoke_token(token)
+        _clear_resume_token()
+        return False
+    _fill_session(tokens[0], tokens[1], user)
+    load_preferences(user.id)
+    return True
+
+
+def _keep_resume_token():
+    """Keep the resume id up to date, rotating the refresh token when stale. True if the tokens changed."""
+    refresh_token = st.session_state.get("refresh_token")
+    if not refresh_token:
+        return False
+    rotated = False
+    if auth_manager.refresh_is_stale(refresh_token):
+        tokens = auth_manager.resume_session(refresh_token)
+        if tokens is not None:
+            auth_manager.revoke_token(st.session_state.token)
+            st.session_state.token, st.session_state.refresh_token = tokens
+            rotated = True
+    _set_resume_token(st.session_state.refresh_token)
+    return rotated
+
+
+def current_session():
+    """Return the verified token payload, ending the session if it is no longer valid"""
+    if not st.session_state.get("logged_in") and not _resume_session():
+        return None
+    payload = auth_manager.verify_token(st.session_state.get("token", ""))
+    if payload is None:
+        end_session()
+        return None
+    if _keep_resume_token():
+        payload = auth_manager.verify_token(st.session_state.token)
+    return payload
+
+
+def require_login():
+    """Stop the page unless the user has a valid session. Returns the token payload."""
+    was_logged_in = st.session_state.get("logged_in", False)
+    payload = current_session()
+    if payload is None:
+        if was_logged_in:
+            st.error("Your session has expired. Please log in again.")
+        else:
+            st.error("Please log in first!")
+        st.info("Go to Home page to login")
+        st.stop()
+    return payload
@@ -0,0 +1,96 @@
+"""Application Configuration
+
+Tunable settings for the platform. Every value can be overridden with an
+environment variable of the same name.
+"""
+
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, default))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.environ.get(name, default))
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.environ.get(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+# OpenAI client connection pool
+OPENAI_MAX_CONNECTIONS = _env_int("OPENAI_MAX_CONNECTIONS", 20)
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = _env_int("OPENAI_MAX_KEEPALIVE_CONNECTIONS", 10)
+OPENAI_KEEPALIVE_EXPIRY = _env_float("OPENAI_KEEPALIVE_EXPIRY", 60.0)
+OPENAI_TIMEOUT = _env_float("OPENAI_TIMEOUT", 60.0)
+OPENAI_CONNECT_TIMEOUT = _env_float("OPENAI_CONNECT_TIMEOUT", 5.0)
+OPENAI_MAX_RETRIES = _env_int("OPENAI_MAX_RETRIES", 2)
+
+# Streamlit data cache for model reads
+CACHE_TTL_SECONDS = _env_int("CACHE_TTL_SECONDS", 300)
+CACHE_MAX_ENTRIES = _env_int("CACHE_MAX_ENTRIES", 64)
+
+# Background dashboard snapshot worker
+SNAPSHOT_INTERVAL_SECONDS = _env_float("SNAPSHOT_INTERVAL_SECONDS", 60.0)
+SNAPSHOT_POLL_SECONDS = _env_float("SNAPSHOT_POLL_SECONDS", 1.0)
+
+# Shared cache for query results and AI responses across server processes
+SHARED_CACHE_BACKEND = os.environ.get("SHARED_CACHE_BACKEND", "sqlite")  # "sqlite" or "memory"
+SHARED_CACHE_PATH = os.environ.get("SHARED_CACHE_PATH", "DATA/shared_cache.db")
+SHARED_CACHE_TTL_SECONDS = _env_int("SHARED_CACHE_TTL_SECONDS", 600)
+SHARED_CACHE_L1_ENTRIES = _env_int("SHARED_CACHE_L1_ENTRIES", 256)
+SHARED_CACHE_MMAP_BYTES = _env_int("SHARED_CACHE_MMAP_BYTES", 256 * 1024 * 1024)
+AI_CACHE_TTL_SECONDS = _env_int("AI_CACHE_TTL_SECONDS", 24 * 60 * 60)
+
+# bcrypt work factor for new and upgraded password hashes.
+# Run `python benchmarks/bcrypt_cost.py` to calibrate it for this hardware.
+BCRYPT_ROUNDS = _env_int("BCRYPT_ROUNDS", 12)
+BCRYPT_TARGET_VERIFY_MS = _env_float("BCRYPT_TARGET_VERIFY_MS", 250.0)
+
+# Password hashing pool (bcrypt work off the Streamlit script threads)
+PASSWORD_POOL_KIND = os.environ.get("PASSWORD_POOL_KIND", "thread")  # "thread" or "process"
+PASSWORD_POOL_WORKERS = _env_int("PASSWORD_POOL_WORKERS", os.cpu_count() or 2)
+PASSWORD_POOL_MAX_PENDING = _env_int("PASSWORD_POOL_MAX_PENDING", 4 * (os.cpu_count() or 2))
+PASSWORD_POOL_TIMEOUT = _env_float("PASSWORD_POOL_TIMEOUT", 10.0)
+
+# Login rate limiting (checked before any bcrypt work)
+LOGIN_LIMIT_BACKEND = os.environ.get("LOGIN_LIMIT_BACKEND", "memory")  # "memory" or "sqlite"
+LOGIN_LIMIT_PATH = os.environ.get("LOGIN_LIMIT_PATH", "DATA/login_limits.db")
+LOGIN_LIMIT_USER_BURST = _env_int("LOGIN_LIMIT_USER_BURST", 5)
+LOGIN_LIMIT_USER_PER_MINUTE = _env_float("LOGIN_LIMIT_USER_PER_MINUTE", 5.0)
+LOGIN_LIMIT_CLIENT_BURST = _env_int("LOGIN_LIMIT_CLIENT_BURST", 20)
+LOGIN_LIMIT_CLIENT_PER_MINUTE = _env_float("LOGIN_LIMIT_CLIENT_PER_MINUTE", 30.0)
+LOGIN_LOCKOUT_FAILURES = _env_int("LOGIN_LOCKOUT_FAILURES", 10)
+LOGIN_LOCKOUT_SECONDS = _env_float("LOGIN_LOCKOUT_SECONDS", 15 * 60.0)
+LOGIN_LIMIT_MAX_KEYS = _env_int("LOGIN_LIMIT_MAX_KEYS", 100000)
+# Comma-separated proxy addresses or networks (e.g. "10.0.0.0/8") whose
+# X-Forwarded-For header is trusted. Empty means the app is reached directly.
+LOGIN_TRUSTED_PROXIES = os.environ.get("LOGIN_TRUSTED_PROXIES", "")
+
+# Legacy users.txt mirror written after registration (off the request path)
+USERS_FILE_MIRROR = _env_bool("USERS_FILE_MIRROR", True)
+USERS_FILE_PATH = os.environ.get("USERS_FILE_PATH", "DATA/users.txt")
+USERS_FILE_BATCH = _env_int("USERS_FILE_BATCH", 256)
+
+# Verified JWTs kept in memory until they expire
+AUTH_TOKEN_CACHE_SIZE = _env_int("AUTH_TOKEN_CACHE_SIZE", 1024)
+
+# Revoked JWTs (logout, account changes)
+TOKEN_REVOCATION_REFRESH_SECONDS = _env_float("TOKEN_REVOCATION_REFRESH_SECONDS", 1.0)
+TOKEN_REVOCATION_PRUNE_SECONDS = _env_float("TOKEN_REVOCATION_PRUNE_SECONDS", 600.0)
+
+# JWT signing secret. Can also be set as AUTH_SECRET_KEY in .streamlit/secrets.toml.
+AUTH_SECRET_KEY = os.environ.get("AUTH_SECRET_KEY", "")
+
+# Session resumption after a browser refresh (opaque id in the URL, the
+# refresh token stays on the server)
+SESSION_RESUME_MINUTES = _env_int("SESSION_RESUME_MINUTES", 30)
+SESSION_RESUME_PARAM = os.environ.get("SESSION_RESUME_PARAM", "sid")
+
+# Chatbot context window (estimated tokens sent per request)
+CHAT_CONTEXT_TOKENS = _env_int("CHAT_CONTEXT_TOKENS", 6000)
+CHAT_CONTEXT_TARGET = _env_float("CHAT_CONTEXT_TARGET", 0.75)  # share of the budget left after folding
+CHAT_SUMMARY_MAX_TOKENS = _env_int("CHAT_SUMMARY_MAX_TOKENS", 400)
+CHAT_SUMMARY_MODEL = os.environ.get("CHAT_SUMMARY_MODEL", "gpt-4o-mini")
+CHAT_PAGE_MESSAGES = _env_int("CHAT_PAGE_MESSAGES", 20)  # messages shown per "load earlier"
@@ -1,14 +1,25 @@
 """Database Connection Module"""
 
 import sqlite3
+import threading
 from pathlib import Path
 
 DB_PATH = Path("DATA") / "intelligence_platform.db"
 
+# Per-table write counters, stored in the data_versions table so that every
+# server process sees them. Every write bumps the version of the tables it
+# touched, and cached reads are keyed on these versions, so a write only
+# invalidates the cache entries that depend on its tables.
+_versions_conn = None
+_versions_lock = threading.Lock()
+
 
 def connect_database(db_path=DB_PATH):
     """Connect to SQLite database. Creates file if it doesn't exist."""
-    return sqlite3.connect(str(db_path))
+    conn = sqlite3.connect(str(db_path))
+    # Off by default in SQLite, needed for ON DELETE CASCADE
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
 
 
 
@@ -18,6 +29,43 @@ def close_database(conn):
         conn.close()
 
 
+def _versions_connection():
+    # One connection for the whole process, as version checks run on every
+    # rerun. Streamlit runs each rerun on a new thread, so the connection is
+    # shared between threads and only used while holding _versions_lock.
+    global _versions_conn
+    if _versions_conn is None:
+        conn = sqlite3.connect(str(DB_PATH), check_same_thread=False)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS data_versions (
+                table_name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        conn.commit()
+        _versions_conn = conn
+    return _versions_conn
+
+
+def get_data_version(*tables):
+    """Return the current write version of each table as a tuple."""
+    with _versions_lock:
+        conn = _versions_connection()
+        versions = dict(conn.execute("SELECT table_name, version FROM data_versions"))
+    return tuple(versions.get(table, 0) for table in tables)
+
+
+def bump_data_version(*tables):
+    """Mark tables as changed so that cached reads of them are refreshed."""
+    with _versions_lock:
+        conn = _versions_connection()
+        conn.executemany("""
+            INSERT INTO data_versions (table_name, version) VALUES (?, 1)
+            ON CONFLICT (table_name) DO UPDATE SET version = version + 1
+        """, [(table,) for table in tables])
+        conn.commit()
+
+
 if __name__ == "__main__":
     try:
         conn = connect_database()
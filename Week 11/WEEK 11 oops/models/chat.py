@@ -0,0 +1,111 @@
+from database.db import connect_database
+
+
+def get_conversation(user_id, domain):
+    """Get the user's latest conversation for a domain as (id, summary, summarized_id, summarized_count), creating one if needed"""
+    conn = connect_database()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT id, summary, summarized_id, summarized_count FROM conversations
+        WHERE user_id = ? AND domain = ?
+        ORDER BY id DESC LIMIT 1
+    """, (user_id, domain))
+    row = cursor.fetchone()
+    conn.close()
+    return row if row else (start_conversation(user_id, domain), "", 0, 0)
+
+
+def start_conversation(user_id, domain):
+    """Start a new, empty conversation and return its id"""
+    conn = connect_database()
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO conversations (user_id, domain) VALUES (?, ?)",
+        (user_id, domain)
+    )
+    conn.commit()
+    conversation_id = cursor.lastrowid
+    conn.close()
+    return conversation_id
+
+
+def save_turn(conversation_id, messages, summary=None):
+    """Append a turn's messages, and the rolling summary if it moved, in one transaction.
+
+    summary is (summary, summarized_id, summarized_count) or None. Returns
+    the ids of the messages."""
+    conn = connect_database()
+    try:
+        with conn:
+            cursor = conn.cursor()
+            ids = []
+            for message in messages:
+                cursor.execute(
+                    "INSERT INTO messages (conversation_id, role, content) VALUES (?, ?, ?)",
+                    (conversation_id, message["role"], message["content"])
+                )
+                ids.append(cursor.lastrowid)
+            if summary is not None:
+                cursor.execute("""
+                    UPDATE conversations SET summary = ?, summarized_id = ?, summarized_count = ?
+                    WHERE id = ?
+                """, (*summary, conversation_id))
+    finally:
+        conn.close()
+    return ids
+
+
+def _to_messages(rows):
+    return [{"id": row[0], "role": row[1], "content": row[2]} for row in rows]
+
+
+def get_recent_messages(conversation_id, limit, before_id=None):
+    """Get up to `limit` messages older than before_id (or the newest), oldest first"""
+    conn = connect_database()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT id, role, content FROM messages
+        WHERE conversation_id = ? AND id < ?
+        ORDER BY id DESC LIMIT ?
+    """, (conversation_id, before_id if before_id is not None else 2 ** 63 - 1, limit))
+    rows = cursor.fetchall()
+    conn.close()
+    return _to_messages(reversed(rows))
+
+
+def get_messages_after(conversation_id, after_id):
+    """Get the messages newer than after_id, oldest first"""
+    conn = connect_database()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT id, role, content FROM messages
+        WHERE conversation_id = ? AND id > ?
+        ORDER BY id
+    """, (conversation_id, after_id))
+    rows = cursor.fetchall()
+    conn.close()
+    return _to_messages(rows)
+
+
+def count_messages(conversation_id):
+    """Count the messages in a conversation"""
+    conn = connect_database()
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM messages WHERE conversation_id = ?", (conversation_id,))
+    count = cursor.fetchone()[0]
+    conn.close()
+    return count
+
+
+def delete_user_conversations(conn, user_id):
+    """Delete a user's conversations and messages inside the caller's transaction"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'conversations'"
+    ).fetchone()
+    if not exists:
+        return
+    conn.execute(
+        "DELETE FROM messages WHERE conversation_id IN (SELECT id FROM conversations WHERE user_id = ?)",
+        (user_id,)
+    )
+    conn.execute("DELETE FROM conversations WHERE user_id = ?", (user_id,))
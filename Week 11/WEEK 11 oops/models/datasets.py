@@ -1,5 +1,5 @@
 import pandas as pd
-from database.db import connect_database
+from database.db import connect_database, bump_data_version
 
 
 def insert_dataset(id,name,source,category,size):
@@ -11,6 +11,7 @@ def insert_dataset(id,name,source,category,size):
         VALUES (?, ?, ?, ?, ?)
     """, (id,name,source,category,size))
     conn.commit()
+    bump_data_version('datasets_metadata')
     dataset_id = cursor.lastrowid
     conn.close()
     return dataset_id
@@ -34,4 +35,5 @@ def delete_dataset(dataset_id):
         (dataset_id,)
     )
     conn.commit()
+    bump_data_version('datasets_metadata')
     conn.close()
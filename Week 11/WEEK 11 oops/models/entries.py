@@ -0,0 +1,127 @@
+import pandas as pd
+from database.db import connect_database
+from models.paging import like_prefix
+
+
+# Entry ID prefix -> (source table, domain)
+ENTRY_SOURCES = {
+    'INC': ('cyber_incidents', 'cybersecurity'),
+    'TKT': ('it_tickets', 'tickets'),
+    'DST': ('datasets_metadata', 'datascience'),
+}
+
+# Domains in display order with their entry views (see models/schema.py)
+DOMAIN_VIEWS = {
+    'cybersecurity': 'incident_entries',
+    'tickets': 'ticket_entries',
+    'datascience': 'dataset_entries',
+}
+
+
+def count_entries():
+    """Get the number of entries per domain"""
+    conn = connect_database()
+    cursor = conn.cursor()
+    counts = {}
+    for table, domain in ENTRY_SOURCES.values():
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        counts[domain] = cursor.fetchone()[0]
+    conn.close()
+    return counts
+
+
+def parse_entry_id(entry_id):
+    """Split 'INC-12' into (table, domain, 12), or None if it is not valid"""
+    prefix, _, source_id = str(entry_id).partition('-')
+    if prefix not in ENTRY_SOURCES or not source_id.isdigit():
+        return None
+    table, domain = ENTRY_SOURCES[prefix]
+    return table, domain, int(source_id)
+
+
+def _id_prefix_ranges(digits, max_id):
+    # Every id whose decimal form starts with `digits`, as rowid ranges:
+    # '12' -> (12, 12), (120, 129), (1200, 1299), ... up to max_id
+    if not digits:
+        return [(1, max_id)]
+    if digits.startswith('0'):
+        return []
+    low = high = int(digits)
+    ranges = []
+    while low <= max_id:
+        ranges.append((low, min(high, max_id)))
+        low, high = low * 10, high * 10 + 9
+    return ranges
+
+
+def search_entries(query, domain=None, limit=20):
+    """Find up to `limit` entries whose ID or title starts with `query`.
+
+    'INC-12' or '12' matches ids starting with 12 (primary key range scans),
+    anything else is a case-insensitive title prefix match on the search
+    indexes. `domain` restricts the search to one domain."""
+    query = (query or '').strip()
+    domains = [domain] if domain else list(DOMAIN_VIEWS)
+
+    prefix, dash, rest = query.partition('-')
+    if dash and prefix.upper() in ENTRY_SOURCES:
+        entry_domain = ENTRY_SOURCES[prefix.upper()][1]
+        domains = [d for d in domains if d == entry_domain]
+        query = rest
+
+    conn = connect_database()
+    cursor = conn.cursor()
+    frames = []
+    for search_domain in domains:
+        if limit <= 0:
+            break
+        view = DOMAIN_VIEWS[search_domain]
+        if query == '' or query.isdigit():
+            cursor.execute(f"SELECT MAX(source_id) FROM {view}")
+            max_id = cursor.fetchone()[0] or 0
+            for low, high in _id_prefix_ranges(query, max_id):
+                if limit <= 0:
+                    break
+                frames.append(pd.read_sql_query(f"""
+                    SELECT entry_id, domain, title
+                    FROM {view}
+                    WHERE source_id BETWEEN ? AND ?
+                    ORDER BY source_id
+                    LIMIT ?
+                """, conn, params=[low, high, limit]))
+                limit -= len(frames[-1])
+        else:
+            frames.append(pd.read_sql_query(f"""
+                SELECT entry_id, domain, title
+                FROM {view}
+                WHERE title LIKE ? ESCAPE '\\'
+                ORDER BY title COLLATE NOCASE
+                LIMIT ?
+            """, conn, params=[like_prefix(query), limit]))
+            limit -= len(frames[-1])
+    conn.close()
+
+    if not frames:
+        return pd.DataFrame(columns=['entry_id', 'domain', 'title'])
+    return pd.concat(frames, ignore_index=True)
+
+
+def get_entry(entry_id):
+    """Get a single entry by its ID (e.g. 'TKT-42') with a primary key lookup.
+
+    Returns (domain, row dict) or None if the entry does not exist."""
+    parsed = parse_entry_id(entry_id)
+    if parsed is None:
+        return None
+    table, domain, source_id = parsed
+
+    conn = connect_database()
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT * FROM {table} WHERE id = ?", (source_id,))
+    row = cursor.fetchone()
+    columns = [col[0] for col in cursor.description]
+    conn.close()
+
+    if row is None:
+        return None
+    return domain, dict(zip(columns, row))
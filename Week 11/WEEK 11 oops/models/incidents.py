@@ -1,5 +1,5 @@
 import pandas as pd
-from database.db import connect_database
+from database.db import connect_database, bump_data_version
 
 
 def insert_incident(date, incident_type, severity, status, description, reported_by=None):
@@ -11,6 +11,7 @@ def insert_incident(date, incident_type, severity, status, description, reported
         VALUES (?, ?, ?, ?, ?, ?)
     """, (date, incident_type, severity, status, description, reported_by))
     conn.commit()
+    bump_data_version('cyber_incidents')
     incident_id = cursor.lastrowid
     conn.close()
     return incident_id
@@ -34,6 +35,7 @@ def update_incident_status(incident_id, new_status):
         (new_status, incident_id)
     )
     conn.commit()
+    bump_data_version('cyber_incidents')
     conn.close()
 
 
@@ -45,6 +47,7 @@ def delete_incident(incident_id):
         (incident_id,)
     )
     conn.commit()
+    bump_data_version('cyber_incidents')
     conn.close()
 
 
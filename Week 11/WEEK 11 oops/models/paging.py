@@ -0,0 +1,62 @@
+import pandas as pd
+from database.db import connect_database
+
+
+def like_prefix(text):
+    """Escape text for use as a `LIKE ? ESCAPE '\\'` prefix pattern"""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def get_table_columns(table):
+    """Get the column names of a table or view"""
+    conn = connect_database()
+    cursor = conn.cursor()
+    cursor.execute(f"PRAGMA table_info({table})")
+    columns = [row[1] for row in cursor.fetchall()]
+    conn.close()
+    return columns
+
+
+def _check_columns(table, *columns):
+    # Column names are put into the SQL text, so only allow real ones
+    known = get_table_columns(table)
+    for column in columns:
+        if column is not None and column not in known:
+            raise ValueError(f"Unknown column '{column}' for {table}")
+
+
+def _filter_clause(filter_column, filter_value):
+    if filter_column and filter_value:
+        return f"WHERE {filter_column} LIKE ? ESCAPE '\\'", [like_prefix(filter_value)]
+    return "", []
+
+
+def count_rows(table, filter_column=None, filter_value=None):
+    """Count the rows of a table, optionally only those whose column starts with filter_value"""
+    _check_columns(table, filter_column)
+    where, params = _filter_clause(filter_column, filter_value)
+    conn = connect_database()
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM {table} {where}", params)
+    count = cursor.fetchone()[0]
+    conn.close()
+    return count
+
+
+def get_rows_page(table, offset=0, limit=25, sort_by=None, descending=False,
+                  filter_column=None, filter_value=None):
+    """Get one page of a table with the sort and prefix filter done in SQL"""
+    _check_columns(table, sort_by, filter_column)
+    where, params = _filter_clause(filter_column, filter_value)
+    order = ""
+    if sort_by:
+        order = f"ORDER BY {sort_by} {'DESC' if descending else 'ASC'}"
+
+    conn = connect_database()
+    df = pd.read_sql_query(
+        f"SELECT * FROM {table} {where} {order} LIMIT ? OFFSET ?",
+        conn,
+        params=params + [limit, offset]
+    )
+    conn.close()
+    return df
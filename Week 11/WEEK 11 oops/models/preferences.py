@@ -0,0 +1,55 @@
+from database.db import connect_database
+
+
+def get_preference(user_id, key, default=None):
+    """Get a single preference value for a user"""
+    conn = connect_database()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT value FROM user_preferences WHERE user_id = ? AND key = ?",
+        (user_id, key)
+    )
+    row = cursor.fetchone()
+    conn.close()
+    return row[0] if row else default
+
+
+def set_preference(user_id, key, value):
+    """Insert or update a single preference value for a user"""
+    conn = connect_database()
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO user_preferences (user_id, key, value)
+        VALUES (?, ?, ?)
+        ON CONFLICT (user_id, key) DO UPDATE SET value = excluded.value
+    """, (user_id, key, value))
+    conn.commit()
+    conn.close()
+
+
+def get_preferences(user_id):
+    """Get all preferences for a user as a {key: value} dict"""
+    conn = connect_database()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT key, value FROM user_preferences WHERE user_id = ?",
+        (user_id,)
+    )
+    preferences = dict(cursor.fetchall())
+    conn.close()
+    return preferences
+
+
+def save_preferences(user_id, changes):
+    """Upsert several preference values for a user in one transaction"""
+    if not changes:
+        return
+    conn = connect_database()
+    cursor = conn.cursor()
+    cursor.executemany("""
+        INSERT INTO user_preferences (user_id, key, value)
+        VALUES (?, ?, ?)
+        ON CONFLICT (user_id, key) DO UPDATE SET value = excluded.value
+    """, [(user_id, key, value) for key, value in changes.items()])
+    conn.commit()
+    conn.close()
@@ -15,6 +15,117 @@ def create_users_table(conn):
     print("✓ Users table created")
 
 
+def create_user_preferences_table(conn):
+    # Keyed by user id, so renames don't touch it and deleting the user
+    # deletes their preferences (with PRAGMA foreign_keys on)
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(user_preferences)")
+    keyed_by_username = "username" in [row[1] for row in cursor.fetchall()]
+    if keyed_by_username:
+        cursor.execute("ALTER TABLE user_preferences RENAME TO user_preferences_old")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_preferences (
+            user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            key TEXT NOT NULL,
+            value TEXT,
+            PRIMARY KEY (user_id, key)
+        )
+    """)
+    if keyed_by_username:
+        # Rows of users that no longer exist are dropped
+        cursor.execute("""
+            INSERT INTO user_preferences (user_id, key, value)
+            SELECT users.id, old.key, old.value
+            FROM user_preferences_old AS old JOIN users ON users.username = old.username
+        """)
+        cursor.execute("DROP TABLE user_preferences_old")
+    conn.commit()
+    print(" User preferences table created")
+
+
+def create_revoked_tokens_table(conn):
+    # Rows are only ever appended, so readers can fetch just the rows after
+    # the last id they saw (see services/token_revocation.py)
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS revoked_tokens (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            jti TEXT NOT NULL UNIQUE,
+            expires_at REAL NOT NULL,
+            revoked_at REAL NOT NULL
+        )
+    """)
+    conn.commit()
+    print(" Revoked tokens table created")
+
+
+def create_revoked_users_table(conn):
+    # Every token of user_id issued before revoked_before is revoked.
+    # Append-only like revoked_tokens.
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS revoked_users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            revoked_before REAL NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    """)
+    conn.commit()
+    print(" Revoked users table created")
+
+
+def create_session_resume_table(conn):
+    # Server-side half of session resumption (components/session_guard.py):
+    # the refresh token, keyed by the SHA-256 of the opaque id the browser has
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS session_resume (
+            id_hash TEXT PRIMARY KEY,
+            refresh_token TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    """)
+    conn.commit()
+    print(" Session resume table created")
+
+
+def create_chat_tables(conn):
+    # One open conversation per user and chatbot domain. Messages are only
+    # ever appended, and clearing the chat starts a new conversation.
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS conversations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            domain TEXT NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            summary TEXT NOT NULL DEFAULT '',
+            summarized_id INTEGER NOT NULL DEFAULT 0,
+            summarized_count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_conversations_user_domain
+        ON conversations (user_id, domain, id)
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            conversation_id INTEGER NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_messages_conversation
+        ON messages (conversation_id, id)
+    """)
+    conn.commit()
+    print(" Chat tables created")
+
+
 def create_cyber_incidents_table(conn):
     cursor = conn.cursor()
     cursor.execute("""
@@ -62,11 +173,99 @@ def create_it_tickets_table(conn):
     print(" IT tickets table created")
 
 
+def create_all_entries_view(conn):
+    # One view per domain plus all_entries, the union of the three, used by
+    # the AI Analysis tab. source_id is the base table's primary key, so
+    # paging a domain view ordered by source_id walks the table's rowid.
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE VIEW IF NOT EXISTS incident_entries AS
+        SELECT 'INC-' || id AS entry_id,
+               'cybersecurity' AS domain,
+               'Cybersecurity Incident' AS type,
+               incident_type AS title,
+               'Severity: ' || IFNULL(severity, '') || ', Status: ' || IFNULL(status, '') AS details,
+               id AS source_id
+        FROM cyber_incidents
+    """)
+    cursor.execute("""
+        CREATE VIEW IF NOT EXISTS ticket_entries AS
+        SELECT 'TKT-' || id AS entry_id,
+               'tickets' AS domain,
+               'IT Ticket' AS type,
+               title,
+               'Priority: ' || IFNULL(priority, '') || ', Status: ' || IFNULL(status, '') AS details,
+               id AS source_id
+        FROM it_tickets
+    """)
+    cursor.execute("""
+        CREATE VIEW IF NOT EXISTS dataset_entries AS
+        SELECT 'DST-' || id AS entry_id,
+               'datascience' AS domain,
+               'Dataset' AS type,
+               name AS title,
+               'Category: ' || IFNULL(category, '') || ', Size: ' || IFNULL(size, '') || ' KB' AS details,
+               id AS source_id
+        FROM datasets_metadata
+    """)
+    cursor.execute("""
+        CREATE VIEW IF NOT EXISTS all_entries AS
+        SELECT * FROM incident_entries
+        UNION ALL
+        SELECT * FROM ticket_entries
+        UNION ALL
+        SELECT * FROM dataset_entries
+    """)
+    conn.commit()
+    print(" All entries views created")
+
+
+def create_search_indexes(conn):
+    # Case-insensitive indexes on the entry titles so that prefix searches
+    # (title LIKE 'abc%') are index range scans instead of table scans
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_incidents_type
+        ON cyber_incidents (incident_type COLLATE NOCASE)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_tickets_title
+        ON it_tickets (title COLLATE NOCASE)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_datasets_name
+        ON datasets_metadata (name COLLATE NOCASE)
+    """)
+    conn.commit()
+    print(" Search indexes created")
+
+
+def create_user_indexes(conn):
+    # (role, username) serves the admin directory's role filter, its
+    # username-ordered pages and the counts by role from the index alone.
+    # Unfiltered pages use the UNIQUE index on username.
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_users_role
+        ON users (role, username)
+    """)
+    conn.commit()
+    print(" User indexes created")
+
+
 def create_all_tables(conn):
     create_users_table(conn)
+    create_user_indexes(conn)
+    create_user_preferences_table(conn)
+    create_revoked_tokens_table(conn)
+    create_revoked_users_table(conn)
+    create_session_resume_table(conn)
+    create_chat_tables(conn)
     create_cyber_incidents_table(conn)
     create_datasets_metadata_table(conn)
     create_it_tickets_table(conn)
+    create_all_entries_view(conn)
+    create_search_indexes(conn)
 
 
 if __name__ == "__main__":
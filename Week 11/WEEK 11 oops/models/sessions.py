@@ -0,0 +1,41 @@
+import time
+
+from database.db import connect_database
+
+
+def save_resume_session(id_hash, refresh_token, expires_at):
+    """Store the refresh token for a resume id, dropping rows that have expired"""
+    conn = connect_database()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM session_resume WHERE expires_at < ?", (time.time(),))
+    cursor.execute(
+        "INSERT OR REPLACE INTO session_resume (id_hash, refresh_token, expires_at) VALUES (?, ?, ?)",
+        (id_hash, refresh_token, expires_at)
+    )
+    conn.commit()
+    conn.close()
+
+
+def take_resume_session(id_hash):
+    """Remove a resume id and return its refresh token, or None if it is unknown or expired"""
+    conn = connect_database()
+    cursor = conn.cursor()
+    cursor.execute(
+        "DELETE FROM session_resume WHERE id_hash = ? RETURNING refresh_token, expires_at",
+        (id_hash,)
+    )
+    row = cursor.fetchone()
+    conn.commit()
+    conn.close()
+    if row is None or row[1] < time.time():
+        return None
+    return row[0]
+
+
+def delete_resume_session(id_hash):
+    """Forget a resume id"""
+    conn = connect_database()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM session_resume WHERE id_hash = ?", (id_hash,))
+    conn.commit()
+    conn.close()
@@ -0,0 +1,98 @@
+from database.db import connect_database
+
+
+def count_by_column(table, column):
+    """Count rows per value of a column, most common first"""
+    import pandas as pd
+    conn = connect_database()
+    df = pd.read_sql_query(f"""
+        SELECT {column}, COUNT(*) as count
+        FROM {table}
+        WHERE {column} IS NOT NULL
+        GROUP BY {column}
+        ORDER BY count DESC
+    """, conn)
+    conn.close()
+    return df
+
+
+def average_of(table, column):
+    """Average of a numeric column, None if the table is empty"""
+    conn = connect_database()
+    value = conn.execute(f"SELECT AVG({column}) FROM {table}").fetchone()[0]
+    conn.close()
+    return value
+
+
+def _counts(cursor, sql):
+    cursor.execute(sql)
+    return dict(cursor.fetchall())
+
+
+def get_platform_summary(conn, top_n=5):
+    """Counts, breakdowns, monthly trends and top-N lists for every domain.
+
+    Returns plain dicts/tuples (no pandas) so it is cheap to snapshot."""
+    cursor = conn.cursor()
+    counts = {}
+    for table in ['users', 'cyber_incidents', 'it_tickets', 'datasets_metadata']:
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        counts[table] = cursor.fetchone()[0]
+
+    breakdowns = {}
+    for name, table, column in [
+        ('incident_severity', 'cyber_incidents', 'severity'),
+        ('incident_status', 'cyber_incidents', 'status'),
+        ('incident_type', 'cyber_incidents', 'incident_type'),
+        ('ticket_priority', 'it_tickets', 'priority'),
+        ('ticket_status', 'it_tickets', 'status'),
+        ('dataset_category', 'datasets_metadata', 'category'),
+        ('dataset_source', 'datasets_metadata', 'source'),
+    ]:
+        breakdowns[name] = _counts(cursor, f"""
+            SELECT {column}, COUNT(*) FROM {table}
+            WHERE {column} IS NOT NULL
+            GROUP BY {column}
+            ORDER BY COUNT(*) DESC
+        """)
+
+    cursor.execute("SELECT AVG(size) FROM datasets_metadata")
+    average_dataset_size = cursor.fetchone()[0]
+
+    trends = {}
+    for name, table, column in [
+        ('incidents_per_month', 'cyber_incidents', 'date'),
+        ('tickets_per_month', 'it_tickets', 'created_date'),
+    ]:
+        cursor.execute(f"""
+            SELECT substr({column}, 1, 7) AS month, COUNT(*) FROM {table}
+            WHERE {column} IS NOT NULL
+            GROUP BY month
+            ORDER BY month
+        """)
+        trends[name] = tuple(cursor.fetchall())
+
+    top = {}
+    cursor.execute("""
+        SELECT reported_by, COUNT(*) FROM cyber_incidents
+        WHERE reported_by IS NOT NULL AND reported_by != ''
+        GROUP BY reported_by
+        ORDER BY COUNT(*) DESC
+        LIMIT ?
+    """, (top_n,))
+    top['incident_reporters'] = tuple(cursor.fetchall())
+    cursor.execute("""
+        SELECT name, size FROM datasets_metadata
+        ORDER BY size DESC
+        LIMIT ?
+    """, (top_n,))
+    top['largest_datasets'] = tuple(cursor.fetchall())
+    top['incident_types'] = tuple(breakdowns['incident_type'].items())[:top_n]
+
+    return {
+        'counts': counts,
+        'breakdowns': breakdowns,
+        'average_dataset_size': average_dataset_size,
+        'trends': trends,
+        'top': top,
+    }
@@ -1,5 +1,5 @@
 import pandas as pd
-from database.db import connect_database
+from database.db import connect_database, bump_data_version
 
 
 def insert_ticket(id,title,priority,status,created_date=None):
@@ -11,6 +11,7 @@ def insert_ticket(id,title,priority,status,created_date=None):
         VALUES (?, ?, ?, ?, ?)
     """, (id, title, priority, status, created_date))
     conn.commit()
+    bump_data_version('it_tickets')
     conn.close()
 
 
@@ -32,6 +33,7 @@ def update_ticket_status(ticket_id, new_status):
         (new_status, ticket_id)
     )
     conn.commit()
+    bump_data_version('it_tickets')
     conn.close()
 
 
@@ -43,4 +45,5 @@ def delete_ticket(ticket_id):
         (ticket_id,)
     )
     conn.commit()
+    bump_data_version('it_tickets')
     conn.close()
@@ -1,4 +1,5 @@
 from database.db import connect_database
+from models.chat import delete_user_conversations
 
 
 def get_user_by_username(username):
@@ -11,23 +12,130 @@ def get_user_by_username(username):
     return user
 
 
+def get_user_by_id(user_id):
+    """Get user by id from database"""
+    conn = connect_database()
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
+    user = cursor.fetchone()
+    conn.close()
+    return user
+
+
 def insert_user(username, password_hash, role='user'):
-    """Insert a new user into the database"""
+    """Insert a new user and return its id. Raises sqlite3.IntegrityError if the username is taken."""
+    conn = connect_database()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)",
+            (username, password_hash, role)
+        )
+        conn.commit()
+        return cursor.lastrowid
+    finally:
+        conn.close()
+
+
+def update_password_hash(user_id, password_hash):
+    """Replace the password hash of a user id"""
     conn = connect_database()
     cursor = conn.cursor()
     cursor.execute(
-        "INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)",
-        (username, password_hash, role)
+        "UPDATE users SET password_hash = ? WHERE id = ?",
+        (password_hash, user_id)
     )
     conn.commit()
     conn.close()
 
 
-def get_all_users():
-    """Get all users from database"""
+def get_password_hash(user_id):
+    """Get the stored password hash for a user id"""
+    conn = connect_database()
+    cursor = conn.cursor()
+    cursor.execute("SELECT password_hash FROM users WHERE id = ?", (user_id,))
+    row = cursor.fetchone()
+    conn.close()
+    return row[0] if row else None
+
+
+def rename_user(user_id, new_username):
+    """Rename a user. Raises sqlite3.IntegrityError if the name is taken."""
+    conn = connect_database()
+    try:
+        with conn:
+            conn.execute("UPDATE users SET username = ? WHERE id = ?", (new_username, user_id))
+    finally:
+        conn.close()
+
+
+def delete_user(user_id):
+    """Delete a user, their preferences (by cascade) and chat history"""
+    conn = connect_database()
+    try:
+        with conn:
+            delete_user_conversations(conn, user_id)
+            conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
+    finally:
+        conn.close()
+
+
+def _prefix_range(prefix):
+    # 'abc' -> ('abc', 'abd'), so username >= ? AND username < ? is a range
+    # scan on the username index (LIKE would not use the BINARY index)
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _directory_filter(prefix, role):
+    clauses, params = [], []
+    if prefix:
+        clauses.append("username >= ? AND username < ?")
+        params.extend(_prefix_range(prefix))
+    if role:
+        clauses.append("role = ?")
+        params.append(role)
+    return clauses, params
+
+
+def search_users(prefix=None, role=None, after=None, limit=50):
+    """Get one page of (id, username, role) ordered by username.
+
+    prefix matches the start of the username (case-sensitive). after is the
+    last username of the previous page (keyset pagination), so every page
+    costs the same however deep it is."""
+    clauses, params = _directory_filter(prefix, role)
+    if after is not None:
+        clauses.append("username > ?")
+        params.append(after)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
     conn = connect_database()
     cursor = conn.cursor()
-    cursor.execute("SELECT id, username, role FROM users")
+    cursor.execute(
+        f"SELECT id, username, role FROM users {where} ORDER BY username LIMIT ?",
+        params + [limit]
+    )
     users = cursor.fetchall()
     conn.close()
     return users
+
+
+def count_users(prefix=None, role=None):
+    """Count the users matching the directory filters"""
+    clauses, params = _directory_filter(prefix, role)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    conn = connect_database()
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM users {where}", params)
+    count = cursor.fetchone()[0]
+    conn.close()
+    return count
+
+
+def count_users_by_role():
+    """Get {role: number of users}"""
+    conn = connect_database()
+    cursor = conn.cursor()
+    cursor.execute("SELECT role, COUNT(*) FROM users GROUP BY role")
+    counts = dict(cursor.fetchall())
+    conn.close()
+    return counts
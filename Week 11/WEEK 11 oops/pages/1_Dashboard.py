@@ -1,15 +1,20 @@
+import time
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+from datetime import date
 from pathlib import Path
 from database.db import connect_database
 from models.schema import create_all_tables
+from models.entries import parse_entry_id
+from components.entity_picker import entity_picker
+from services.data_cache import count_rows, count_by_column, average_of, invalidate
+from services.snapshot_worker import latest_snapshot
+from services.chart_specs import get_chart_spec
+from components.paged_grid import paged_grid
+from components.session_guard import require_login
 
 st.set_page_config(page_title="Dashboard", page_icon="shield", layout="wide")
 
-if "logged_in" not in st.session_state or not st.session_state.logged_in:
-    st.error("Please log in first!")
-    st.stop()
+require_login()
 
 with st.sidebar:
     st.write(f"User: {st.session_state.username}")
@@ -33,9 +38,46 @@ if "dashboard_view" not in st.session_state:
 
 st.divider()
 
+# Metric tiles come from the background snapshot. Right after this user
+# edits a table, until a snapshot newer than the edit exists, they use the
+# versioned queries instead so the edit shows up straight away.
+BREAKDOWNS = {
+    'incident_severity': ('cyber_incidents', 'severity'),
+    'incident_status': ('cyber_incidents', 'status'),
+    'ticket_status': ('it_tickets', 'status'),
+    'dataset_category': ('datasets_metadata', 'category'),
+}
+
+def record_edit(table):
+    invalidate(table)
+    st.session_state.dashboard_edited_at = time.time()
+
+def snapshot_is_current(snapshot):
+    return snapshot is not None and snapshot.created_at >= st.session_state.get("dashboard_edited_at", 0)
+
+def table_total(snapshot, table):
+    if snapshot_is_current(snapshot):
+        return snapshot.counts[table]
+    return count_rows(table)
+
+def breakdown(snapshot, name):
+    if snapshot_is_current(snapshot):
+        return snapshot.breakdowns[name]
+    table, column = BREAKDOWNS[name]
+    counts = count_by_column(table, column)
+    return dict(zip(counts[column], counts['count']))
+
+def average_dataset_size(snapshot):
+    if snapshot_is_current(snapshot):
+        return snapshot.average_dataset_size
+    return average_of('datasets_metadata', 'size')
+
 def load_csv():
+    import pandas as pd
+
     conn = connect_database()
     cursor = conn.cursor()
+    loaded = []
     for table, csv_file in {'cyber_incidents': 'cyber_incidents.csv', 'it_tickets': 'it_tickets.csv', 'datasets_metadata': 'datasets_metadata.csv'}.items():
         cursor.execute(f"SELECT COUNT(*) FROM {table}")
         if cursor.fetchone()[0] == 0:
@@ -45,40 +87,49 @@ def load_csv():
                 if 'id' in df.columns:
                     df = df.drop('id', axis=1)
                 df.to_sql(table, conn, if_exists='append', index=False)
+                loaded.append(table)
     conn.commit()
     conn.close()
+    invalidate(*loaded)
 
-try:
-    from models.incidents import get_all_incidents
+@st.cache_resource
+def init_dashboard_tables():
+    # Once per server process, not on every rerun
     conn = connect_database()
     create_all_tables(conn)
     conn.close()
     load_csv()
+
+try:
+    init_dashboard_tables()
     
     conn = connect_database()
+    snapshot = latest_snapshot()
+    if snapshot:
+        st.caption(f"Snapshot updated {snapshot.describe_age()}")
     
     if st.session_state.dashboard_view == "cybersecurity":
         st.header("Cybersecurity Dashboard")
-        df = get_all_incidents()
+        total = table_total(snapshot, 'cyber_incidents')
         
-        if not df.empty:
+        if total:
             col1, col2, col3, col4 = st.columns(4)
-            col1.metric("Total", len(df))
-            col2.metric("Critical", len(df[df['severity'] == 'critical']))
-            col3.metric("High", len(df[df['severity'] == 'high']))
-            col4.metric("Resolved", len(df[df['status'] == 'resolved']))
+            severity_counts = breakdown(snapshot, 'incident_severity')
+            status_counts = breakdown(snapshot, 'incident_status')
+            col1.metric("Total", total)
+            col2.metric("Critical", severity_counts.get('critical', 0))
+            col3.metric("High", severity_counts.get('high', 0))
+            col4.metric("Resolved", status_counts.get('resolved', 0))
             
             st.divider()
             col1, col2 = st.columns(2)
             with col1:
-                fig = px.bar(x=df['severity'].value_counts().index, y=df['severity'].value_counts().values, title="By Severity")
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(get_chart_spec('incidents_by_severity'), use_container_width=True)
             with col2:
-                fig = px.pie(values=df['status'].value_counts().values, names=df['status'].value_counts().index, title="By Status")
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(get_chart_spec('incidents_by_status'), use_container_width=True)
             
             st.divider()
-            st.dataframe(df, use_container_width=True)
+            paged_grid('cyber_incidents', key='incidents_grid', sort_by='id', descending=True)
             
             st.divider()
             tab1, tab2, tab3, tab4 = st.tabs(["Create", "Update", "Delete", "View All"])
@@ -89,20 +140,23 @@ try:
                     severity = st.selectbox("Severity", ["low", "medium", "high", "critical"])
                     if st.form_submit_button("Create") and incident_type:
                         conn.execute("INSERT INTO cyber_incidents (date, incident_type, severity, status, description, reported_by) VALUES (?, ?, ?, 'open', '', ?)",
-                                   (str(pd.Timestamp.now().date()), incident_type, severity, st.session_state.username))
+                                   (str(date.today()), incident_type, severity, st.session_state.username))
                         conn.commit()
+                        record_edit('cyber_incidents')
                         st.success("Created!")
                         st.rerun()
             
             with tab2:
-                temp_df = pd.read_sql_query("SELECT id, incident_type FROM cyber_incidents", conn)
-                if not temp_df.empty:
+                entry_id = entity_picker("Incident", key="update_incident", domain="cybersecurity")
+                parsed = parse_entry_id(entry_id) if entry_id else None
+                if parsed is not None:
+                    incident_id = parsed[2]
                     with st.form("update"):
-                        incident_id = st.selectbox("ID", temp_df['id'].tolist())
                         new_status = st.selectbox("Status", ["open", "in_progress", "resolved", "closed"])
                         if st.form_submit_button("Update"):
                             conn.execute("UPDATE cyber_incidents SET status=? WHERE id=?", (new_status, incident_id))
                             conn.commit()
+                            record_edit('cyber_incidents')
                             st.success("Updated!")
                             st.rerun()
             
@@ -112,34 +166,34 @@ try:
                     if st.form_submit_button("Delete"):
                         conn.execute("DELETE FROM cyber_incidents WHERE id=?", (incident_id,))
                         conn.commit()
+                        record_edit('cyber_incidents')
                         st.success("Deleted!")
                         st.rerun()
             
             with tab4:
-                st.dataframe(df, use_container_width=True)
+                paged_grid('cyber_incidents', key='incidents_all', sort_by='id')
     
     elif st.session_state.dashboard_view == "tickets":
         st.header("IT Tickets Dashboard")
-        df = pd.read_sql_query("SELECT * FROM it_tickets", conn)
+        total = table_total(snapshot, 'it_tickets')
         
-        if not df.empty:
+        if total:
             col1, col2, col3, col4 = st.columns(4)
-            col1.metric("Total", len(df))
-            col2.metric("Open", len(df[df['status'] == 'open']))
-            col3.metric("In Progress", len(df[df['status'] == 'in_progress']))
-            col4.metric("Closed", len(df[df['status'] == 'closed']))
+            status_counts = breakdown(snapshot, 'ticket_status')
+            col1.metric("Total", total)
+            col2.metric("Open", status_counts.get('open', 0))
+            col3.metric("In Progress", status_counts.get('in_progress', 0))
+            col4.metric("Closed", status_counts.get('closed', 0))
             
             st.divider()
             col1, col2 = st.columns(2)
             with col1:
-                fig = px.bar(x=df['priority'].value_counts().index, y=df['priority'].value_counts().values, title="By Priority")
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(get_chart_spec('tickets_by_priority'), use_container_width=True)
             with col2:
-                fig = px.pie(values=df['status'].value_counts().values, names=df['status'].value_counts().index, title="By Status")
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(get_chart_spec('tickets_by_status'), use_container_width=True)
             
             st.divider()
-            st.dataframe(df, use_container_width=True)
+            paged_grid('it_tickets', key='tickets_grid', sort_by='id', descending=True)
             
             st.divider()
             tab1, tab2, tab3, tab4 = st.tabs(["Create", "Update", "Delete", "View All"])
@@ -150,20 +204,23 @@ try:
                     priority = st.selectbox("Priority", ["low", "medium", "high", "critical"])
                     if st.form_submit_button("Create") and title:
                         conn.execute("INSERT INTO it_tickets (title, priority, status, created_date) VALUES (?, ?, 'open', ?)",
-                                   (title, priority, str(pd.Timestamp.now().date())))
+                                   (title, priority, str(date.today())))
                         conn.commit()
+                        record_edit('it_tickets')
                         st.success("Created!")
                         st.rerun()
             
             with tab2:
-                temp_df = pd.read_sql_query("SELECT id, title FROM it_tickets", conn)
-                if not temp_df.empty:
+                entry_id = entity_picker("Ticket", key="update_ticket", domain="tickets")
+                parsed = parse_entry_id(entry_id) if entry_id else None
+                if parsed is not None:
+                    ticket_id = parsed[2]
                     with st.form("update"):
-                        ticket_id = st.selectbox("ID", temp_df['id'].tolist())
                         new_status = st.selectbox("Status", ["open", "in_progress", "closed"])
                         if st.form_submit_button("Update"):
                             conn.execute("UPDATE it_tickets SET status=? WHERE id=?", (new_status, ticket_id))
                             conn.commit()
+                            record_edit('it_tickets')
                             st.success("Updated!")
                             st.rerun()
             
@@ -173,34 +230,34 @@ try:
                     if st.form_submit_button("Delete"):
                         conn.execute("DELETE FROM it_tickets WHERE id=?", (ticket_id,))
                         conn.commit()
+                        record_edit('it_tickets')
                         st.success("Deleted!")
                         st.rerun()
             
             with tab4:
-                st.dataframe(df, use_container_width=True)
+                paged_grid('it_tickets', key='tickets_all', sort_by='id')
     
     elif st.session_state.dashboard_view == "datascience":
         st.header("Data Science Dashboard")
-        df = pd.read_sql_query("SELECT * FROM datasets_metadata", conn)
+        total = table_total(snapshot, 'datasets_metadata')
         
-        if not df.empty:
+        if total:
             col1, col2, col3, col4 = st.columns(4)
-            col1.metric("Total", len(df))
-            col2.metric("Security", len(df[df['category'] == 'Security']))
-            col3.metric("Analytics", len(df[df['category'] == 'Analytics']))
-            col4.metric("Avg Size", f"{df['size'].mean():.1f}")
+            category_counts = breakdown(snapshot, 'dataset_category')
+            col1.metric("Total", total)
+            col2.metric("Security", category_counts.get('Security', 0))
+            col3.metric("Analytics", category_counts.get('Analytics', 0))
+            col4.metric("Avg Size", f"{average_dataset_size(snapshot) or 0:.1f}")
             
             st.divider()
             col1, col2 = st.columns(2)
             with col1:
-                fig = px.bar(x=df['source'].value_counts().index, y=df['source'].value_counts().values, title="By Source")
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(get_chart_spec('datasets_by_source'), use_container_width=True)
             with col2:
-                fig = px.pie(values=df['category'].value_counts().values, names=df['category'].value_counts().index, title="By Category")
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(get_chart_spec('datasets_by_category'), use_container_width=True)
             
             st.divider()
-            st.dataframe(df, use_container_width=True)
+            paged_grid('datasets_metadata', key='datasets_grid', sort_by='id', descending=True)
             
             st.divider()
             tab1, tab2, tab3, tab4 = st.tabs(["Create", "Update", "Delete", "View All"])
@@ -212,18 +269,21 @@ try:
                     if st.form_submit_button("Create") and name:
                         conn.execute("INSERT INTO datasets_metadata (name, category, source, size) VALUES (?, ?, 'Manual', 0)", (name, category))
                         conn.commit()
+                        record_edit('datasets_metadata')
                         st.success("Created!")
                         st.rerun()
             
             with tab2:
-                temp_df = pd.read_sql_query("SELECT id, name FROM datasets_metadata", conn)
-                if not temp_df.empty:
+                entry_id = entity_picker("Dataset", key="update_dataset", domain="datascience")
+                parsed = parse_entry_id(entry_id) if entry_id else None
+                if parsed is not None:
+                    dataset_id = parsed[2]
                     with st.form("update"):
-                        dataset_id = st.selectbox("ID", temp_df['id'].tolist())
                         new_category = st.selectbox("Category", ["Security", "Analytics", "Operations"])
                         if st.form_submit_button("Update"):
                             conn.execute("UPDATE datasets_metadata SET category=? WHERE id=?", (new_category, dataset_id))
                             conn.commit()
+                            record_edit('datasets_metadata')
                             st.success("Updated!")
                             st.rerun()
             
@@ -233,11 +293,12 @@ try:
                     if st.form_submit_button("Delete"):
                         conn.execute("DELETE FROM datasets_metadata WHERE id=?", (dataset_id,))
                         conn.commit()
+                        record_edit('datasets_metadata')
                         st.success("Deleted!")
                         st.rerun()
             
             with tab4:
-                st.dataframe(df, use_container_width=True)
+                paged_grid('datasets_metadata', key='datasets_all', sort_by='id')
     
     conn.close()
 
@@ -1,16 +1,24 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
 from pathlib import Path
-from database.db import connect_database
-from openai import OpenAI
+import config
+from database.db import connect_database, get_data_version
+from models.schema import (
+    create_cyber_incidents_table, create_it_tickets_table, create_datasets_metadata_table,
+    create_all_entries_view, create_search_indexes
+)
+from models.entries import get_entry, parse_entry_id
+from services.shared_cache import get_shared_cache
+from services.data_cache import count_entries, invalidate
+from services.openai_client import get_openai_client
+from components.entity_picker import entity_picker
+from services.chart_specs import get_chart_spec
+from components.paged_grid import paged_grid
+from services.snapshot_worker import latest_snapshot
+from components.session_guard import require_login
 
 st.set_page_config(page_title="Analytics & Reporting", layout="wide")
 
-if "logged_in" not in st.session_state or not st.session_state.logged_in:
-    st.error("Please log in first!")
-    st.info("Go to Home page to login")
-    st.stop()
+require_login()
 
 with st.sidebar:
     st.write(f"User: {st.session_state.username}")
@@ -18,40 +26,85 @@ with st.sidebar:
 
 st.title("Analytics & Reporting")
 
-# Initialize OpenAI client
-client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
+def load_csv_data(conn):
+    import pandas as pd
 
-def load_csv_data():
-    conn = connect_database()
+    # Append into the schema's tables so they keep their INTEGER PRIMARY KEY,
+    # which get_entry and the paged range scans rely on
     tables = {
         'cyber_incidents': 'cyber_incidents.csv',
         'it_tickets': 'it_tickets.csv',
         'datasets_metadata': 'datasets_metadata.csv'
     }
+    loaded = []
     for table_name, csv_file in tables.items():
         cursor = conn.cursor()
-        cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table_name}'")
-        if not cursor.fetchone():
+        cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+        if cursor.fetchone()[0] == 0:
             csv_path = Path("DATA") / csv_file
             if csv_path.exists():
                 df = pd.read_csv(csv_path)
-                df.to_sql(table_name, conn, if_exists='replace', index=False)
+                df.to_sql(table_name, conn, if_exists='append', index=False)
+                loaded.append(table_name)
     conn.commit()
-    conn.close()
+    invalidate(*loaded)
 
-load_csv_data()
 
-try:
+@st.cache_resource
+def init_entry_tables():
+    # Once per server process, not on every rerun. Raising leaves it
+    # uncached, so the next rerun tries again.
     conn = connect_database()
-    incidents_df = pd.read_sql_query("SELECT * FROM cyber_incidents", conn)
-    tickets_df = pd.read_sql_query("SELECT * FROM it_tickets", conn)
-    datasets_df = pd.read_sql_query("SELECT * FROM datasets_metadata", conn)
-    conn.close()
+    try:
+        create_cyber_incidents_table(conn)
+        create_it_tickets_table(conn)
+        create_datasets_metadata_table(conn)
+        load_csv_data(conn)
+        create_all_entries_view(conn)
+        create_search_indexes(conn)
+    finally:
+        conn.close()
+
+
+def snapshot_frame(rows, columns, index=None):
+    """DataFrame of snapshot rows (pandas is only imported once there is a snapshot to show)"""
+    import pandas as pd
+
+    df = pd.DataFrame(rows, columns=columns)
+    return df.set_index(index) if index else df
+
+
+def analysis_prompts(domain, data):
+    """(system_prompt, user_prompt) for analysing an entry, None for an unknown domain"""
+    if domain == "cybersecurity":
+        text = f"Type: {data['incident_type']}, Severity: {data['severity']}, Status: {data['status']}, Date: {data['date']}, Description: {data['description']}"
+        system_prompt = "You are a cybersecurity expert. Analyze incidents and provide root cause analysis, immediate actions, prevention measures, and risk assessment."
+        user_prompt = f"Analyze this incident:\n{text}"
+    
+    elif domain == "tickets":
+        text = f"Title: {data['title']}, Priority: {data['priority']}, Status: {data['status']}, Date: {data['created_date']}"
+        system_prompt = "You are an IT operations expert. Analyze tickets and provide problem diagnosis, troubleshooting steps, and resolution recommendations."
+        user_prompt = f"Analyze this ticket:\n{text}"
+    
+    elif domain == "datascience":
+        text = f"Name: {data['name']}, Category: {data['category']}, Source: {data['source']}, Size: {data['size']} KB"
+        system_prompt = "You are a data science expert. Analyze datasets and provide quality assessment, analysis methods, and visualization recommendations."
+        user_prompt = f"Analyze this dataset:\n{text}"
+    
+    else:
+        return None
+    return system_prompt, user_prompt
+
+
+try:
+    init_entry_tables()
+    entry_counts = count_entries()
+    snapshot = latest_snapshot()
     
     col1, col2, col3 = st.columns(3)
-    col1.metric("Total Incidents", len(incidents_df))
-    col2.metric("Total Tickets", len(tickets_df))
-    col3.metric("Total Datasets", len(datasets_df))
+    col1.metric("Total Incidents", entry_counts['cybersecurity'])
+    col2.metric("Total Tickets", entry_counts['tickets'])
+    col3.metric("Total Datasets", entry_counts['datascience'])
     
     st.divider()
     
@@ -59,114 +112,90 @@ try:
     
     with tab1:
         st.header("Incident Analysis")
-        type_counts = incidents_df['incident_type'].value_counts().reset_index()
-        type_counts.columns = ['type', 'count']
-        severity_counts = incidents_df['severity'].value_counts().reset_index()
-        severity_counts.columns = ['severity', 'count']
         
         col1, col2 = st.columns(2)
         with col1:
             st.markdown("Incidents by Type")
-            fig3 = px.bar(type_counts, x='type', y='count')
-            st.plotly_chart(fig3, use_container_width=True)
+            st.plotly_chart(get_chart_spec('incidents_by_type'), use_container_width=True)
         
         with col2:
             st.markdown("Severity Breakdown")
-            fig4 = px.bar(severity_counts, x='severity', y='count', color='severity')
-            st.plotly_chart(fig4, use_container_width=True)
+            st.plotly_chart(get_chart_spec('incident_severity_breakdown'), use_container_width=True)
+        
+        if snapshot:
+            st.markdown("Incidents per Month")
+            st.line_chart(snapshot_frame(snapshot.trends['incidents_per_month'], ['month', 'count'], index='month'))
+            st.markdown("Top Reporters")
+            st.table(snapshot_frame(snapshot.top['incident_reporters'], ['reported_by', 'incidents']))
+            st.caption(f"Trends snapshot updated {snapshot.describe_age()}")
     
     with tab2:
         st.header("Ticket Analysis")
-        priority_counts = tickets_df['priority'].value_counts().reset_index()
-        priority_counts.columns = ['priority', 'count']
-        ticket_status_counts = tickets_df['status'].value_counts().reset_index()
-        ticket_status_counts.columns = ['status', 'count']
         
         col1, col2 = st.columns(2)
         with col1:
             st.markdown("Tickets by Priority")
-            fig5 = px.bar(priority_counts, x='priority', y='count', color='priority')
-            st.plotly_chart(fig5, use_container_width=True)
+            st.plotly_chart(get_chart_spec('ticket_priority_breakdown'), use_container_width=True)
         
         with col2:
             st.markdown("Tickets by Status")
-            fig6 = px.pie(ticket_status_counts, values='count', names='status')
-            st.plotly_chart(fig6, use_container_width=True)
+            st.plotly_chart(get_chart_spec('ticket_status_breakdown'), use_container_width=True)
+        
+        if snapshot:
+            st.markdown("Tickets per Month")
+            st.line_chart(snapshot_frame(snapshot.trends['tickets_per_month'], ['month', 'count'], index='month'))
+            st.caption(f"Trends snapshot updated {snapshot.describe_age()}")
     
     with tab3:
         st.header("AI-Enhanced Analysis")
         
-        # Combine all data
-        all_entries = []
-        for idx, row in incidents_df.iterrows():
-            all_entries.append({
-                'ID': f"INC-{row['id']}",
-                'Type': 'Cybersecurity Incident',
-                'Title': row['incident_type'],
-                'Details': f"Severity: {row['severity']}, Status: {row['status']}",
-                'data': row,
-                'domain': 'cybersecurity'
-            })
+        # Entries come from the all_entries view one page at a time
+        total_entries = sum(entry_counts.values())
+        st.info(f"Total entries available: {total_entries} ({entry_counts['cybersecurity']} incidents + {entry_counts['tickets']} tickets + {entry_counts['datascience']} datasets)")
         
-        for idx, row in tickets_df.iterrows():
-            all_entries.append({
-                'ID': f"TKT-{row['id']}",
-                'Type': 'IT Ticket',
-                'Title': row['title'],
-                'Details': f"Priority: {row['priority']}, Status: {row['status']}",
-                'data': row,
-                'domain': 'tickets'
-            })
-        
-        for idx, row in datasets_df.iterrows():
-            all_entries.append({
-                'ID': f"DST-{row['id']}",
-                'Type': 'Dataset',
-                'Title': row['name'],
-                'Details': f"Category: {row['category']}, Size: {row['size']} KB",
-                'data': row,
-                'domain': 'datascience'
-            })
-        
-        all_df = pd.DataFrame(all_entries)
-        st.info(f"Total entries available: {len(all_df)} ({len(incidents_df)} incidents + {len(tickets_df)} tickets + {len(datasets_df)} datasets)")
-        
-        st.dataframe(all_df[['ID', 'Type', 'Title', 'Details']], use_container_width=True)
+        paged_grid('all_entries', key='entries_grid')
         
         st.divider()
         
-        selected_id = st.selectbox("Select Entry ID", all_df['ID'].tolist())
+        selected_id = entity_picker("Select Entry ID", key="analysis_entry")
         
-        if st.button("Analyze", type="primary"):
-            selected = all_df[all_df['ID'] == selected_id].iloc[0]
-            domain = selected['domain']
-            data = selected['data']
+        if st.button("Analyze", type="primary", disabled=selected_id is None):
+            # The entry may have been deleted since it was picked
+            parsed = parse_entry_id(selected_id)
+            entry = get_entry(selected_id) if parsed is not None else None
+            prompts = analysis_prompts(*entry) if entry is not None else None
             
-            with st.spinner("Analyzing..."):
-                if domain == "cybersecurity":
-                    text = f"Type: {data['incident_type']}, Severity: {data['severity']}, Status: {data['status']}, Date: {data['date']}, Description: {data['description']}"
-                    system_prompt = "You are a cybersecurity expert. Analyze incidents and provide root cause analysis, immediate actions, prevention measures, and risk assessment."
-                    user_prompt = f"Analyze this incident:\n{text}"
-                
-                elif domain == "tickets":
-                    text = f"Title: {data['title']}, Priority: {data['priority']}, Status: {data['status']}, Date: {data['created_date']}"
-                    system_prompt = "You are an IT operations expert. Analyze tickets and provide problem diagnosis, troubleshooting steps, and resolution recommendations."
-                    user_prompt = f"Analyze this ticket:\n{text}"
-                
-                elif domain == "datascience":
-                    text = f"Name: {data['name']}, Category: {data['category']}, Source: {data['source']}, Size: {data['size']} KB"
-                    system_prompt = "You are a data science expert. Analyze datasets and provide quality assessment, analysis methods, and visualization recommendations."
-                    user_prompt = f"Analyze this dataset:\n{text}"
+            if parsed is None or entry is None:
+                st.error("Entry not found")
+            elif prompts is None:
+                st.error(f"Analysis is not available for {entry[0]} entries")
+            else:
+                system_prompt, user_prompt = prompts
                 
-                response = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ]
-                )
-                st.success("Analysis Complete!")
-                st.markdown(response.choices[0].message.content)
+                with st.spinner("Analyzing..."):
+                    client = get_openai_client(st.secrets["OPENAI_API_KEY"])
+                    
+                    def run_analysis():
+                        response = client.chat.completions.create(
+                            model="gpt-4o-mini",
+                            messages=[
+                                {"role": "system", "content": system_prompt},
+                                {"role": "user", "content": user_prompt}
+                            ]
+                        )
+                        return response.choices[0].message.content
+                    
+                    # Shared across sessions and server processes until the entry's table changes
+                    table = parsed[0]
+                    analysis = get_shared_cache().get_or_compute(
+                        "ai.analysis",
+                        get_data_version(table),
+                        ("gpt-4o-mini", system_prompt, user_prompt),
+                        run_analysis,
+                        ttl=config.AI_CACHE_TTL_SECONDS
+                    )
+                    st.success("Analysis Complete!")
+                    st.markdown(analysis)
 
 except Exception as e:
     st.error(f"Error loading data: {str(e)}")
@@ -0,0 +1,90 @@
+import streamlit as st
+from database.db import connect_database
+from models.schema import create_user_indexes
+from models.users import search_users, count_users, count_users_by_role
+from services.auth_manager import auth_manager
+from components.paged_grid import get_page_size
+from components.session_guard import require_login
+
+st.set_page_config(page_title="User Directory", layout="wide")
+
+require_login()
+
+if not auth_manager.check_permission(st.session_state.role, 'admin'):
+    st.error("Admins only")
+    st.stop()
+
+with st.sidebar:
+    st.write(f"User: {st.session_state.username}")
+    st.write(f"Role: {st.session_state.role.upper()}")
+
+st.title("User Directory")
+
+
+@st.cache_resource
+def init_user_indexes():
+    # Once per server process, not on every rerun
+    conn = connect_database()
+    create_user_indexes(conn)
+    conn.close()
+
+
+def directory_frame(rows):
+    import pandas as pd
+
+    return pd.DataFrame(rows, columns=["id", "username", "role"])
+
+
+init_user_indexes()
+
+ROLES = ["user", "analyst", "admin"]
+
+# Counts by role
+role_counts = count_users_by_role()
+cols = st.columns(len(ROLES) + 1)
+cols[0].metric("Total Users", f"{sum(role_counts.values()):,}")
+for col, role in zip(cols[1:], ROLES):
+    col.metric(role.capitalize(), f"{role_counts.get(role, 0):,}")
+
+st.divider()
+
+col1, col2 = st.columns(2)
+with col1:
+    prefix = st.text_input("Username starts with", key="directory_prefix").strip()
+with col2:
+    role_choice = st.selectbox("Role", ["All"] + ROLES, key="directory_role")
+role = None if role_choice == "All" else role_choice
+page_size = get_page_size()
+
+# Keyset pagination: keep the last username of each page we passed, and
+# start over whenever the filters change
+filters = (prefix, role, page_size)
+if st.session_state.get("directory_filters") != filters:
+    st.session_state.directory_filters = filters
+    st.session_state.directory_cursors = [None]
+cursors = st.session_state.directory_cursors
+
+# One extra row tells us whether there is a next page
+rows = search_users(prefix or None, role, after=cursors[-1], limit=page_size + 1)
+has_next = len(rows) > page_size
+rows = rows[:page_size]
+
+total = count_users(prefix or None, role)
+st.dataframe(directory_frame(rows), use_container_width=True, hide_index=True)
+
+page_number = len(cursors)
+if total:
+    first = (page_number - 1) * page_size + 1
+    st.caption(f"Users {first}-{first + len(rows) - 1} of {total:,}")
+else:
+    st.caption("No users found")
+
+col1, col2 = st.columns(2)
+with col1:
+    if st.button("Previous", use_container_width=True, disabled=page_number == 1):
+        cursors.pop()
+        st.rerun()
+with col2:
+    if st.button("Next", use_container_width=True, disabled=not has_next):
+        cursors.append(rows[-1][1])
+        st.rerun()
@@ -1,14 +1,21 @@
+import sqlite3
+from dataclasses import replace
 import streamlit as st
-import bcrypt
 from database.db import connect_database
+from models.users import get_password_hash, update_password_hash, rename_user, delete_user
+from services.passwords import get_hash_rounds
+from services.password_pool import hash_password, verify_password, PoolOverloadedError
+from services.user_service import BUSY_MESSAGE
+from services.auth_manager import auth_manager
+from services.preferences import get_preference, save_preferences
+from components.paged_grid import PAGE_SIZES, get_page_size
+from components.session_guard import require_login, start_session, end_session
 
 st.set_page_config(page_title="Settings", layout="wide")
 
 # Check login
-if "logged_in" not in st.session_state or not st.session_state.logged_in:
-    st.error("Please log in first!")
-    st.info("Go to Home page to login")
-    st.stop()
+require_login()
+user = st.session_state.user
 
 # Sidebar
 with st.sidebar:
@@ -17,6 +24,22 @@ with st.sidebar:
 
 st.title("⚙️ Settings")
 
+
+def run_password_task(fn, *args):
+    # bcrypt runs on the shared pool, which refuses work when it is saturated
+    try:
+        return fn(*args)
+    except PoolOverloadedError:
+        st.error(BUSY_MESSAGE)
+        st.stop()
+
+
+def check_password(password):
+    # The hash isn't kept in the session, read it by primary key when needed
+    password_hash = get_password_hash(user.id)
+    return password_hash is not None and run_password_task(verify_password, password, password_hash)
+
+
 # Profile Info
 st.header("Profile Information")
 col1, col2, col3 = st.columns(3)
@@ -42,10 +65,11 @@ st.divider()
 st.header("Appearance")
 col1, col2 = st.columns(2)
 with col1:
-    theme = st.selectbox("Theme", ["Light", "Dark", "Auto"], index=2)
+    themes = ["Light", "Dark", "Auto"]
+    theme = st.selectbox("Theme", themes, index=themes.index(get_preference("theme")))
     st.info(f"Current theme: {theme}")
 with col2:
-    page_size = st.selectbox("Data Display Rows", [10, 25, 50, 100], index=1)
+    page_size = st.selectbox("Data Display Rows", PAGE_SIZES, index=PAGE_SIZES.index(get_page_size()))
     st.info(f"Showing {page_size} rows per page")
 
 st.divider()
@@ -54,14 +78,25 @@ st.divider()
 st.header("Notifications")
 col1, col2 = st.columns(2)
 with col1:
-    email_notif = st.checkbox("Email Notifications", value=True)
-    security_alerts = st.checkbox("Security Alerts", value=True)
+    email_notif = st.checkbox("Email Notifications", value=get_preference("email_notifications"))
+    security_alerts = st.checkbox("Security Alerts", value=get_preference("security_alerts"))
 with col2:
-    system_updates = st.checkbox("System Updates", value=False)
-    weekly_report = st.checkbox("Weekly Report", value=False)
+    system_updates = st.checkbox("System Updates", value=get_preference("system_updates"))
+    weekly_report = st.checkbox("Weekly Report", value=get_preference("weekly_report"))
 
 if st.button("Save Preferences", use_container_width=True):
-    st.success("Preferences saved successfully!")
+    changed = save_preferences({
+        "theme": theme,
+        "page_size": page_size,
+        "email_notifications": email_notif,
+        "security_alerts": security_alerts,
+        "system_updates": system_updates,
+        "weekly_report": weekly_report,
+    })
+    if changed:
+        st.success("Preferences saved successfully!")
+    else:
+        st.info("No changes to save")
 
 st.divider()
 
@@ -77,26 +112,20 @@ with st.form("username_form"):
             st.error("All fields are required")
         elif len(new_username) < 3:
             st.error("Username must be at least 3 characters")
-        else:
-            conn = connect_database()
-            cursor = conn.cursor()
-            cursor.execute("SELECT password_hash FROM users WHERE username = ?", (st.session_state.username,))
-            result = cursor.fetchone()
-            
-            if result and bcrypt.checkpw(confirm_password_1.encode('utf-8'), result[0].encode('utf-8')):
-                cursor.execute("SELECT username FROM users WHERE username = ?", (new_username,))
-                if cursor.fetchone():
-                    st.error("Username already exists")
-                else:
-                    cursor.execute("UPDATE users SET username = ? WHERE username = ?", 
-                                 (new_username, st.session_state.username))
-                    conn.commit()
-                    st.session_state.username = new_username
-                    st.success("Username updated!")
-                    st.rerun()
+        elif check_password(confirm_password_1):
+            try:
+                rename_user(user.id, new_username)
+            except sqlite3.IntegrityError:
+                st.error("Username already exists")
             else:
-                st.error("Incorrect password")
-            conn.close()
+                # Tokens of every session name the old username, revoke them
+                # all and issue new ones for this session
+                auth_manager.revoke_user(user.id)
+                start_session(replace(user, username=new_username))
+                st.success("Username updated!")
+                st.rerun()
+        else:
+            st.error("Incorrect password")
 
 st.divider()
 
@@ -115,21 +144,15 @@ with st.form("password_form"):
             st.error("Password must be at least 6 characters")
         elif new_password != confirm_new_password:
             st.error("New passwords do not match")
+        elif check_password(old_password):
+            new_hash = run_password_task(hash_password, new_password)
+            update_password_hash(user.id, new_hash)
+            # Sign out other sessions that still use the old password
+            auth_manager.revoke_user(user.id)
+            start_session(replace(user, hash_cost=get_hash_rounds(new_hash)))
+            st.success("Password updated!")
         else:
-            conn = connect_database()
-            cursor = conn.cursor()
-            cursor.execute("SELECT password_hash FROM users WHERE username = ?", (st.session_state.username,))
-            result = cursor.fetchone()
-            
-            if result and bcrypt.checkpw(old_password.encode('utf-8'), result[0].encode('utf-8')):
-                new_hash = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-                cursor.execute("UPDATE users SET password_hash = ? WHERE username = ?", 
-                             (new_hash, st.session_state.username))
-                conn.commit()
-                st.success("Password updated!")
-            else:
-                st.error("Current password is incorrect")
-            conn.close()
+            st.error("Current password is incorrect")
 
 st.divider()
 
@@ -144,30 +167,18 @@ with st.form("delete_form"):
     if submit_delete:
         if not confirm_delete_password:
             st.error("Please enter your password")
+        elif check_password(confirm_delete_password):
+            delete_user(user.id)
+            auth_manager.revoke_user(user.id)
+            end_session()
+            st.success("Account deleted")
+            st.rerun()
         else:
-            conn = connect_database()
-            cursor = conn.cursor()
-            cursor.execute("SELECT password_hash FROM users WHERE username = ?", (st.session_state.username,))
-            result = cursor.fetchone()
-            
-            if result and bcrypt.checkpw(confirm_delete_password.encode('utf-8'), result[0].encode('utf-8')):
-                cursor.execute("DELETE FROM users WHERE username = ?", (st.session_state.username,))
-                conn.commit()
-                conn.close()
-                st.session_state.logged_in = False
-                st.session_state.username = ""
-                st.session_state.role = ""
-                st.success("Account deleted")
-                st.rerun()
-            else:
-                st.error("Incorrect password")
-                conn.close()
+            st.error("Incorrect password")
 
 st.divider()
 
 # Logout
 if st.button("Logout", use_container_width=True):
-    st.session_state.logged_in = False
-    st.session_state.username = ""
-    st.session_state.role = ""
+    end_session()
     st.rerun()
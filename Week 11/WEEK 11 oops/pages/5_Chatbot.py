@@ -1,5 +1,15 @@
 import streamlit as st
-from openai import OpenAI
+from dataclasses import replace
+import config
+from database.db import connect_database
+from models.schema import create_chat_tables
+from models.chat import (
+    get_conversation, start_conversation, save_turn, get_recent_messages,
+    get_messages_after, count_messages
+)
+from services.openai_client import get_openai_client
+from services.chat_context import ChatContext, summary_prompt
+from components.session_guard import require_login
 
 # Page configuration
 st.set_page_config(
@@ -9,12 +19,7 @@ st.set_page_config(
 )
 
 # Check authentication
-if "logged_in" not in st.session_state or not st.session_state.logged_in:
-    st.error("Please log in first!")
-    st.stop()
-
-# Initialize OpenAI client
-client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
+require_login()
 
 # Title
 st.title("💬 ChatGPT - OpenAI API")
@@ -32,13 +37,41 @@ Help with analysis, visualization, and statistical insights.""",
 Help troubleshoot issues, optimize systems, and manage tickets."""
 }
 
-# Initialize session state
-if 'messages' not in st.session_state:
-    st.session_state.messages = []
 
+@st.cache_resource
+def init_chat_tables():
+    # Once per server process, not on every rerun
+    conn = connect_database()
+    create_chat_tables(conn)
+    conn.close()
+
+
+init_chat_tables()
+
+
+def open_conversation(conversation_id, context):
+    # Only the newest page of messages is loaded, older ones on request
+    st.session_state.conversation_id = conversation_id
+    st.session_state.chat_context = context
+    st.session_state.messages = get_recent_messages(conversation_id, config.CHAT_PAGE_MESSAGES)
+    st.session_state.message_count = count_messages(conversation_id)
+    st.session_state.chat_shown = config.CHAT_PAGE_MESSAGES
+
+
+def chat_key():
+    return (st.session_state.user.id, st.session_state.selected_domain)
+
+
+# Initialize session state
 if 'selected_domain' not in st.session_state:
     st.session_state.selected_domain = "Cybersecurity"
 
+# Chat history is stored per user and domain, so it survives reloads and domain switches
+if st.session_state.get('chat_key') != chat_key():
+    conversation_id, summary, summarized_id, summarized_count = get_conversation(*chat_key())
+    st.session_state.chat_key = chat_key()
+    open_conversation(conversation_id, ChatContext(summary, summarized_count, summarized_id))
+
 # Sidebar with controls
 with st.sidebar:
     st.subheader("User Info")
@@ -57,8 +90,7 @@ with st.sidebar:
     
     # Update domain if changed
     if domain != st.session_state.selected_domain:
-        st.session_state.selected_domain = domain
-        st.session_state.messages = []  # Clear chat when domain changes
+        st.session_state.selected_domain = domain  # The domain's conversation loads on rerun
         st.success(f"Switched to {domain} domain")
         st.rerun()
     
@@ -70,12 +102,13 @@ with st.sidebar:
     st.subheader("Chat Controls")
     
     # Display message count
-    message_count = len([m for m in st.session_state.messages if m["role"] != "system"])
-    st.metric("Messages", message_count)
+    st.metric("Messages", st.session_state.message_count)
+    if st.session_state.chat_context.summarized:
+        st.caption(f"{st.session_state.chat_context.summarized} older messages are sent as a summary")
     
-    # Clear chat button
+    # Clear chat button (starts a new conversation, the old one stays stored)
     if st.button("🗑 Clear Chat", use_container_width=True):
-        st.session_state.messages = []
+        open_conversation(start_conversation(*chat_key()), ChatContext())
         st.rerun()
     
     # Model selection
@@ -85,7 +118,18 @@ with st.sidebar:
         index=1
     )
 
-# Display all previous messages
+# Load earlier messages one page at a time
+if len(st.session_state.messages) < st.session_state.message_count:
+    if st.button("Load earlier messages"):
+        earlier = get_recent_messages(
+            st.session_state.conversation_id,
+            config.CHAT_PAGE_MESSAGES,
+            before_id=st.session_state.messages[0]["id"]
+        )
+        st.session_state.messages = earlier + st.session_state.messages
+        st.session_state.chat_shown += config.CHAT_PAGE_MESSAGES
+
+# Display the loaded messages
 for message in st.session_state.messages:
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
@@ -98,41 +142,67 @@ if prompt:
     with st.chat_message("user"):
         st.markdown(prompt)
     
-    # Add user message to session state
-    st.session_state.messages.append({
-        "role": "user",
-        "content": prompt
-    })
+    conversation_id = st.session_state.conversation_id
+    context = st.session_state.chat_context
+    # Nothing is stored until the reply is in, a failed call leaves the
+    # conversation (and its summary) as it was
+    context_before = replace(context)
+    user_message = {"role": "user", "content": prompt}
     
-    # Prepare messages with system prompt
-    messages_with_system = [
-        {"role": "system", "content": DOMAIN_PROMPTS[st.session_state.selected_domain]}
-    ] + st.session_state.messages
+    client = get_openai_client(st.secrets["OPENAI_API_KEY"])
     
-    # Call OpenAI API with streaming
-    with st.spinner("Thinking..."):
-        completion = client.chat.completions.create(
-            model=model,
-            messages=messages_with_system,
-            stream=True
+    def summarize(previous_summary, messages):
+        response = client.chat.completions.create(
+            model=config.CHAT_SUMMARY_MODEL,
+            messages=summary_prompt(previous_summary, messages),
+            max_tokens=config.CHAT_SUMMARY_MAX_TOKENS
         )
+        return response.choices[0].message.content
     
-    # Display streaming response
-    with st.chat_message("assistant"):
-        container = st.empty()
-        full_reply = ""
-        
-        for chunk in completion:
-            delta = chunk.choices[0].delta
-            if delta.content:
-                full_reply += delta.content
-                container.markdown(full_reply + "▌")  # Add cursor effect
+    full_reply = None
+    try:
+        # System prompt, summary of older turns and the recent turns that fit the token budget
+        with st.spinner("Thinking..."):
+            # Everything after the summary, ending with the new question
+            recent = get_messages_after(conversation_id, context.summarized_id) + [user_message]
+            messages_with_system = context.build(
+                DOMAIN_PROMPTS[st.session_state.selected_domain],
+                recent,
+                summarize
+            )
+            completion = client.chat.completions.create(
+                model=model,
+                messages=messages_with_system,
+                stream=True
+            )
         
-        # Remove cursor and show final response
-        container.markdown(full_reply)
+        # Display streaming response
+        with st.chat_message("assistant"):
+            container = st.empty()
+            reply = ""
+            
+            for chunk in completion:
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    reply += delta.content
+                    container.markdown(reply + "▌")  # Add cursor effect
+            
+            # Remove cursor and show final response
+            container.markdown(reply)
+        full_reply = reply
+    except Exception as e:
+        st.error(f"Could not get a reply: {e}")
+        st.session_state.chat_context = context_before
     
-    # Save assistant response
-    st.session_state.messages.append({
-        "role": "assistant",
-        "content": full_reply
-    })
+    if full_reply is not None:
+        # The question, the reply and the summary update in one transaction
+        assistant_message = {"role": "assistant", "content": full_reply}
+        summary = None
+        if context.summarized != context_before.summarized:
+            summary = (context.summary, context.summarized_id, context.summarized)
+        ids = save_turn(conversation_id, [user_message, assistant_message], summary)
+        for message_id, message in zip(ids, [user_message, assistant_message]):
+            st.session_state.messages.append({"id": message_id, **message})
+        st.session_state.message_count += 2
+    # Keep the rendered window bounded as the chat grows
+    st.session_state.messages = st.session_state.messages[-st.session_state.chat_shown:]
@@ -1,13 +1,15 @@
 # AI Assistant Service
 # Provides AI-powered assistance and analysis
 
-import openai
 from typing import List, Dict, Any, Optional
 import json
 
+from services.openai_client import get_openai_client
+
 class AIAssistant:
     def __init__(self, api_key: str):
-        self.client = openai.OpenAI(api_key=api_key)
+        # Shared, lazily built client (see services/openai_client.py)
+        self.client = get_openai_client(api_key)
 
     def analyze_text(self, text: str, domain: str = "general") -> Dict[str, Any]:
         """Analyze text content using AI"""
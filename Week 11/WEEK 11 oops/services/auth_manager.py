@@ -1,36 +1,200 @@
 # Auth Manager Service
 # Handles authentication and authorization
+#
+# Pages verify the session token on every rerun (components/session_guard.py).
+# Tokens that verified once are kept in an LRU dict until their exp, so a
+# rerun costs one dict lookup instead of an HMAC check plus claim parsing.
+# Each token carries a jti, and revoked jtis (see services/token_revocation.py)
+# fail verification even while the token is cached. revoke_user revokes
+# every token of a user issued so far, for account changes that must end
+# all of their sessions.
+#
+# Besides the 24 hour access token, login issues a short-lived refresh token
+# (typ 'refresh', SESSION_RESUME_MINUTES) that the server keeps for the
+# browser session so a reload can resume it with a signature check instead of bcrypt.
+# Refresh tokens are single use: resume_session revokes the one it was given
+# and issues a new pair.
+#
+# Tokens are signed with AUTH_SECRET_KEY from the environment or
+# st.secrets. Until it is set, no token is issued and none verifies, as
+# anyone could forge tokens signed with a default key.
 
-import jwt
 import datetime
-from typing import Optional, Dict, Any
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Optional, Dict, Any, Mapping
+
+import config
+from services.token_revocation import get_revocation_list
+
+DEFAULT_SECRET_KEY = "your-secret-key"
+ACCESS_TOKEN_LIFETIME = datetime.timedelta(hours=24)
+
+
+class AuthConfigError(RuntimeError):
+    """Raised when a token is requested but no signing secret is configured"""
+
+
+def _load_secret_key() -> Optional[str]:
+    # The environment wins over .streamlit/secrets.toml
+    secret_key = config.AUTH_SECRET_KEY
+    if secret_key:
+        return secret_key
+    try:
+        import streamlit as st
+        secret_key = st.secrets.get("AUTH_SECRET_KEY")
+    except Exception:
+        # No secrets file, or not running under Streamlit
+        return None
+    return str(secret_key) if secret_key else None
+
 
 class AuthManager:
-    def __init__(self, secret_key: str = "your-secret-key"):
-        self.secret_key = secret_key
+    def __init__(self, secret_key: Optional[str] = None,
+                 cache_size: int = config.AUTH_TOKEN_CACHE_SIZE):
+        self._secret_key = secret_key
+        self.cache_size = cache_size
+        self._verified = OrderedDict()  # token -> (payload, exp)
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
 
-    def generate_token(self, user_id: int, username: str, role: str) -> str:
-        """Generate JWT token for user"""
+    @property
+    def secret_key(self) -> Optional[str]:
+        """The signing secret, None while it is missing or still the default"""
+        if self._secret_key is None:
+            self._secret_key = _load_secret_key()
+        if not self._secret_key or self._secret_key == DEFAULT_SECRET_KEY:
+            return None
+        return self._secret_key
+
+    def generate_token(self, user_id: int, username: str, role: str,
+                       token_type: str = 'access',
+                       lifetime: datetime.timedelta = ACCESS_TOKEN_LIFETIME) -> str:
+        """Generate JWT token for user. Raises AuthConfigError if no secret is configured."""
+        secret_key = self.secret_key
+        if secret_key is None:
+            raise AuthConfigError(
+                "AUTH_SECRET_KEY is not set. Add it to the environment or .streamlit/secrets.toml."
+            )
+        import jwt
         payload = {
             'user_id': user_id,
             'username': username,
             'role': role,
-            'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=24),
-            'iat': datetime.datetime.utcnow()
+            'exp': datetime.datetime.utcnow() + lifetime,
+            # Sub-second, so revoke_user can tell tokens issued just after it apart
+            'iat': time.time(),
+            'jti': uuid.uuid4().hex,
+            'typ': token_type
         }
-        token = jwt.encode(payload, self.secret_key, algorithm='HS256')
+        token = jwt.encode(payload, secret_key, algorithm='HS256')
         return token
 
-    def verify_token(self, token: str) -> Optional[Dict[str, Any]]:
-        """Verify and decode JWT token"""
+    def generate_refresh_token(self, user_id: int, username: str, role: str) -> str:
+        """Generate the short-lived token used to resume a session after a reload"""
+        return self.generate_token(
+            user_id, username, role, token_type='refresh',
+            lifetime=datetime.timedelta(minutes=config.SESSION_RESUME_MINUTES)
+        )
+
+    def verify_token(self, token: str, token_type: Optional[str] = 'access') -> Optional[Mapping[str, Any]]:
+        """Verify and decode JWT token, using the verified-token cache.
+
+        token_type=None accepts any type of token."""
+        payload = self._verify(token)
+        if payload is None:
+            return None
+        if token_type is not None and payload.get('typ', 'access') != token_type:
+            return None
+        return payload
+
+    def _verify(self, token: str) -> Optional[Mapping[str, Any]]:
+        secret_key = self.secret_key
+        if not token or secret_key is None:
+            return None
+        cached = self._cached_payload(token)
+        if cached is not None:
+            return None if self._is_revoked(cached) else cached
+
+        import jwt
         try:
-            payload = jwt.decode(token, self.secret_key, algorithms=['HS256'])
-            return payload
+            payload = jwt.decode(token, secret_key, algorithms=['HS256'])
         except jwt.ExpiredSignatureError:
             return None
         except jwt.InvalidTokenError:
             return None
 
+        # Read-only, as the same payload is handed to every later caller
+        payload = MappingProxyType(payload)
+        with self._cache_lock:
+            self.cache_misses += 1
+            self._verified[token] = (payload, payload['exp'])
+            while len(self._verified) > self.cache_size:
+                self._verified.popitem(last=False)
+        return None if self._is_revoked(payload) else payload
+
+    @staticmethod
+    def _is_revoked(payload: Mapping[str, Any]) -> bool:
+        return get_revocation_list().is_revoked(
+            payload.get('jti'), payload.get('user_id'), payload.get('iat')
+        )
+
+    def revoke_token(self, token: str) -> None:
+        """Revoke a token until it expires (logout, account deleted or renamed)"""
+        payload = self.verify_token(token, token_type=None)
+        if payload is None or 'jti' not in payload:
+            return
+        get_revocation_list().revoke(payload['jti'], payload['exp'])
+        self.forget_token(token)
+
+    def revoke_user(self, user_id: int) -> None:
+        """Revoke every token issued to a user so far, in every session (account deleted or renamed)"""
+        now = time.time()
+        longest = max(ACCESS_TOKEN_LIFETIME.total_seconds(), config.SESSION_RESUME_MINUTES * 60)
+        get_revocation_list().revoke_user(user_id, now, now + longest)
+
+    def _cached_payload(self, token: str) -> Optional[Mapping[str, Any]]:
+        with self._cache_lock:
+            cached = self._verified.get(token)
+            if cached is None:
+                return None
+            payload, exp = cached
+            if exp <= time.time():
+                del self._verified[token]
+                return None
+            self._verified.move_to_end(token)
+            self.cache_hits += 1
+            return payload
+
+    def forget_token(self, token: str) -> None:
+        """Drop a token from the verified cache so the next check decodes it again"""
+        with self._cache_lock:
+            self._verified.pop(token, None)
+
+    def resume_session(self, refresh_token: str):
+        """Exchange a refresh token for a new (access_token, refresh_token) pair.
+
+        The refresh token given is revoked, so each one works once. Returns
+        None if it is expired, revoked or not a refresh token."""
+        payload = self.verify_token(refresh_token, token_type='refresh')
+        if payload is None:
+            return None
+        self.revoke_token(refresh_token)
+        user_id, username, role = payload['user_id'], payload['username'], payload['role']
+        return (self.generate_token(user_id, username, role),
+                self.generate_refresh_token(user_id, username, role))
+
+    def refresh_is_stale(self, refresh_token: str) -> bool:
+        """True once a refresh token is past half its lifetime, time to rotate it"""
+        payload = self.verify_token(refresh_token, token_type='refresh')
+        if payload is None:
+            return False
+        return payload['exp'] - time.time() < config.SESSION_RESUME_MINUTES * 30
+
     def get_user_from_token(self, token: str) -> Optional[Dict[str, Any]]:
         """Extract user info from token"""
         payload = self.verify_token(token)
@@ -55,5 +219,6 @@ class AuthManager:
 
         return user_level >= required_level
 
+
 # Global instance
 auth_manager = AuthManager()
@@ -0,0 +1,54 @@
+# Chart Spec Service
+# Builds the dashboard and analytics charts once per data version and caches
+# the Plotly figure as JSON. Pages only load the cached spec and hand it to
+# st.plotly_chart, so reruns that don't change the data skip both the
+# aggregation and the figure construction.
+
+import json
+
+import streamlit as st
+
+import config
+from database.db import get_data_version
+from services.data_cache import count_by_column
+from services.shared_cache import get_shared_cache
+
+# name -> (table, column, chart kind, title, colour bars by value)
+CHARTS = {
+    'incidents_by_severity': ('cyber_incidents', 'severity', 'bar', 'By Severity', False),
+    'incidents_by_status': ('cyber_incidents', 'status', 'pie', 'By Status', False),
+    'incidents_by_type': ('cyber_incidents', 'incident_type', 'bar', None, False),
+    'incident_severity_breakdown': ('cyber_incidents', 'severity', 'bar', None, True),
+    'tickets_by_priority': ('it_tickets', 'priority', 'bar', 'By Priority', False),
+    'tickets_by_status': ('it_tickets', 'status', 'pie', 'By Status', False),
+    'ticket_priority_breakdown': ('it_tickets', 'priority', 'bar', None, True),
+    'ticket_status_breakdown': ('it_tickets', 'status', 'pie', None, False),
+    'datasets_by_source': ('datasets_metadata', 'source', 'bar', 'By Source', False),
+    'datasets_by_category': ('datasets_metadata', 'category', 'pie', 'By Category', False),
+}
+
+
+def _build_chart_json(name):
+    import plotly.express as px
+
+    table, column, kind, title, colour = CHARTS[name]
+    counts = count_by_column(table, column)
+    if kind == 'pie':
+        fig = px.pie(counts, values='count', names=column, title=title)
+    else:
+        fig = px.bar(counts, x=column, y='count', title=title, color=column if colour else None)
+    return fig.to_json()
+
+
+@st.cache_data(ttl=config.CACHE_TTL_SECONDS, max_entries=config.CACHE_MAX_ENTRIES, show_spinner=False)
+def _chart_json(name, version):
+    return get_shared_cache().get_or_compute(
+        "chart", version, name, lambda: _build_chart_json(name),
+        ttl=config.CACHE_TTL_SECONDS, use_l1=False
+    )
+
+
+def get_chart_spec(name):
+    """Return the cached figure for a chart in CHARTS as a plotly figure dict"""
+    table = CHARTS[name][0]
+    return json.loads(_chart_json(name, get_data_version(table)))
@@ -0,0 +1,112 @@
+# Chat Context Service
+# Keeps the messages sent to the chat API within a token budget, so a long
+# conversation costs about the same per turn as a short one.
+#
+# Each request is the system prompt, a rolling summary of the older turns,
+# and as many recent turns as fit in CHAT_CONTEXT_TOKENS. Token counts are
+# estimated locally (about 4 characters per token). When the recent turns no
+# longer fit, the oldest ones are folded into the summary until the request
+# is back under CHAT_CONTEXT_TARGET of the budget. That leaves room for
+# several more turns before the next fold, so the summarizer runs now and
+# then, only ever on the newly dropped turns.
+#
+# The summary and the id of the last message it covers are stored with the
+# conversation (models/chat.py), so only the messages after that id need to
+# be loaded to build a request.
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, cast
+
+import config
+
+if TYPE_CHECKING:
+    from openai.types.chat import ChatCompletionMessageParam
+
+# Role and formatting tokens the API adds to every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# {'role', 'content'}, plus 'id' for messages loaded from the database
+Message = Dict[str, Any]
+# summarize(previous_summary, messages_to_fold) -> new summary
+Summarizer = Callable[[str, List[Message]], str]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English text, no tokenizer needed"""
+    return (len(text) + 3) // 4
+
+
+def message_tokens(message: Message) -> int:
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+@dataclass
+class ChatContext:
+    """Rolling summary state for one conversation, kept in session_state"""
+    summary: str = ""
+    summarized: int = 0  # how many of the oldest messages the summary covers
+    summarized_id: int = 0  # id of the newest stored message it covers
+
+    def reset(self) -> None:
+        self.summary = ""
+        self.summarized = 0
+        self.summarized_id = 0
+
+    def _summary_message(self) -> List[Message]:
+        if not self.summary:
+            return []
+        return [{"role": "system", "content": f"Summary of the earlier conversation:\n{self.summary}"}]
+
+    def build(self, system_prompt: str, recent: List[Message], summarize: Summarizer,
+              budget: int = config.CHAT_CONTEXT_TOKENS,
+              target: float = config.CHAT_CONTEXT_TARGET) -> List["ChatCompletionMessageParam"]:
+        """Return the messages to send for this turn, folding old turns into the summary if needed.
+
+        recent is every message after summarized_id, oldest first, ending
+        with the new user message."""
+        system = [{"role": "system", "content": system_prompt}]
+        recent_tokens = [message_tokens(message) for message in recent]
+
+        def fixed_tokens():
+            return sum(message_tokens(message) for message in system + self._summary_message())
+
+        if fixed_tokens() + sum(recent_tokens) > budget:
+            # Fold from the oldest end until the rest fits in the target,
+            # always keeping the latest message
+            limit = budget * target - fixed_tokens()
+            fold = 0
+            remaining = sum(recent_tokens)
+            while fold < len(recent) - 1 and remaining > limit:
+                remaining -= recent_tokens[fold]
+                fold += 1
+            # Nothing to fold when the new message alone is over the budget
+            if fold:
+                try:
+                    self.summary = summarize(self.summary, recent[:fold])
+                except Exception as e:
+                    # Without a summary the folded turns are just dropped, the
+                    # chat carries on with the recent turns
+                    print(f"Chat summary failed, dropping {fold} older messages: {e}")
+                self.summarized += fold
+                self.summarized_id = recent[fold - 1].get("id", self.summarized_id)
+                recent = recent[fold:]
+
+        # Only role and content go to the API, the stored id stays behind
+        return cast(List["ChatCompletionMessageParam"], system + self._summary_message() + [
+            {"role": message["role"], "content": message["content"]} for message in recent
+        ])
+
+
+def summary_prompt(previous_summary: str, messages: List[Message]) -> List["ChatCompletionMessageParam"]:
+    """Messages asking a model to extend previous_summary with the given turns"""
+    transcript = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+    return [
+        {"role": "system", "content": (
+            "You maintain a running summary of a conversation between a user and an assistant. "
+            "Update the summary with the new turns. Keep facts, decisions, names, numbers and "
+            "open questions; drop pleasantries. Reply with the updated summary only."
+        )},
+        {"role": "user", "content": (
+            f"Current summary:\n{previous_summary or '(none)'}\n\nNew turns:\n{transcript}"
+        )},
+    ]
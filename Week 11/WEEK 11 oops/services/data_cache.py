@@ -0,0 +1,173 @@
+# Data Cache Service
+# Cached versions of the model read functions for the Streamlit pages.
+#
+# Each cached function takes the data version of the tables it reads as an
+# extra argument (see database.db.get_data_version). Model writes call
+# bump_data_version, so the next read of those tables misses the cache and
+# reloads, while cached reads of other tables are left alone. Old versions
+# age out through the TTL and max_entries limits.
+#
+# st.cache_data is the in-process layer. On a miss the value is looked up in
+# the shared cache (services/shared_cache.py) before querying, so several
+# server processes compute each result only once per data version.
+
+import streamlit as st
+
+import config
+from database.db import get_data_version, bump_data_version
+from models import incidents, tickets, datasets, entries, summaries, paging
+from services.shared_cache import get_shared_cache
+from services.snapshot_worker import get_snapshot_worker
+
+INCIDENTS = 'cyber_incidents'
+TICKETS = 'it_tickets'
+DATASETS = 'datasets_metadata'
+ENTRY_TABLES = (INCIDENTS, TICKETS, DATASETS)
+
+# Views and the tables whose writes change them
+VIEW_TABLES = {
+    'all_entries': ENTRY_TABLES,
+    'incident_entries': (INCIDENTS,),
+    'ticket_entries': (TICKETS,),
+    'dataset_entries': (DATASETS,),
+}
+
+_cache = st.cache_data(
+    ttl=config.CACHE_TTL_SECONDS,
+    max_entries=config.CACHE_MAX_ENTRIES,
+    show_spinner=False,
+)
+
+
+def invalidate(*tables):
+    """Call after writing to tables outside the model functions"""
+    bump_data_version(*tables)
+    # The worker would see the commit on its next poll, this saves the wait
+    get_snapshot_worker().request_refresh()
+
+
+def _shared(name, version, args, compute):
+    return get_shared_cache().get_or_compute(
+        f"data.{name}", version, args, compute,
+        ttl=config.CACHE_TTL_SECONDS, use_l1=False
+    )
+
+
+@_cache
+def _get_all_incidents(version):
+    return _shared('all_incidents', version, (), incidents.get_all_incidents)
+
+
+@_cache
+def _get_incidents_by_type(version):
+    return _shared('incidents_by_type', version, (), incidents.get_incidents_by_type)
+
+
+@_cache
+def _get_all_tickets(version):
+    return _shared('all_tickets', version, (), tickets.get_all_tickets)
+
+
+@_cache
+def _get_all_datasets(version):
+    return _shared('all_datasets', version, (), datasets.get_all_datasets)
+
+
+@_cache
+def _count_by_column(version, table, column):
+    return _shared('count_by_column', version, (table, column),
+                   lambda: summaries.count_by_column(table, column))
+
+
+@_cache
+def _average_of(version, table, column):
+    return _shared('average_of', version, (table, column),
+                   lambda: summaries.average_of(table, column))
+
+
+@_cache
+def _count_entries(version):
+    return _shared('count_entries', version, (), entries.count_entries)
+
+
+@_cache
+def _count_rows(version, table, filter_column, filter_value):
+    return _shared('count_rows', version, (table, filter_column, filter_value),
+                   lambda: paging.count_rows(table, filter_column, filter_value))
+
+
+@_cache
+def _get_rows_page(version, table, offset, limit, sort_by, descending, filter_column, filter_value):
+    args = (table, offset, limit, sort_by, descending, filter_column, filter_value)
+    return _shared('rows_page', version, args, lambda: paging.get_rows_page(*args))
+
+
+@st.cache_data(show_spinner=False)
+def get_table_columns(table):
+    # Schema only changes with a deploy, so no version or TTL
+    return paging.get_table_columns(table)
+
+
+@_cache
+def _search_entries(version, query, domain, limit):
+    return _shared('search_entries', version, (query, domain, limit),
+                   lambda: entries.search_entries(query, domain=domain, limit=limit))
+
+
+def get_all_incidents():
+    return _get_all_incidents(get_data_version(INCIDENTS))
+
+
+def get_incidents_by_type():
+    return _get_incidents_by_type(get_data_version(INCIDENTS))
+
+
+def get_all_tickets():
+    return _get_all_tickets(get_data_version(TICKETS))
+
+
+def get_all_datasets():
+    return _get_all_datasets(get_data_version(DATASETS))
+
+
+def count_by_column(table, column):
+    return _count_by_column(get_data_version(table), table, column)
+
+
+def average_of(table, column):
+    return _average_of(get_data_version(table), table, column)
+
+
+def count_entries():
+    return _count_entries(get_data_version(*ENTRY_TABLES))
+
+
+def _table_version(table):
+    return get_data_version(*VIEW_TABLES.get(table, (table,)))
+
+
+def count_rows(table, filter_column=None, filter_value=None):
+    return _count_rows(_table_version(table), table, filter_column, filter_value)
+
+
+def get_rows_page(table, offset=0, limit=25, sort_by=None, descending=False,
+                  filter_column=None, filter_value=None):
+    return _get_rows_page(
+        _table_version(table), table, offset, limit, sort_by, descending,
+        filter_column, filter_value
+    )
+
+
+def _search_tables(domain):
+    # Only the searched domain's table affects the results
+    if domain is None:
+        return ENTRY_TABLES
+    return tuple(
+        table for table, entry_domain in entries.ENTRY_SOURCES.values()
+        if entry_domain == domain
+    )
+
+
+def search_entries(query, domain=None, limit=20):
+    version = get_data_version(*_search_tables(domain))
+    return _search_entries(version, query, domain, limit)
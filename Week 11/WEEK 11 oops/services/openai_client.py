@@ -0,0 +1,62 @@
+# OpenAI Client Service
+# Builds one OpenAI client per API key on first use and shares it across
+# every session in the process, so reruns reuse the same keep-alive pool.
+
+import threading
+from typing import TYPE_CHECKING, Dict
+
+import config
+
+if TYPE_CHECKING:
+    # Type checkers only, openai is still imported lazily at runtime
+    from openai import OpenAI
+
+_clients: Dict[str, "OpenAI"] = {}
+_clients_lock = threading.Lock()
+
+
+def _build_client(api_key: str) -> "OpenAI":
+    """Create an OpenAI client backed by a pooled httpx transport"""
+    from openai import OpenAI, DefaultHttpxClient, Timeout
+    from openai._constants import DEFAULT_CONNECTION_LIMITS
+
+    # The SDK's own client class, so it is the http client type OpenAI
+    # expects and keeps the SDK's other defaults. The SDK doesn't export its
+    # Limits class, so it is taken from the SDK's default limits.
+    Limits = type(DEFAULT_CONNECTION_LIMITS)
+    http_client = DefaultHttpxClient(
+        limits=Limits(
+            max_connections=config.OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=config.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=config.OPENAI_KEEPALIVE_EXPIRY,
+        ),
+        timeout=Timeout(
+            config.OPENAI_TIMEOUT,
+            connect=config.OPENAI_CONNECT_TIMEOUT,
+        ),
+    )
+    return OpenAI(
+        api_key=api_key,
+        http_client=http_client,
+        max_retries=config.OPENAI_MAX_RETRIES,
+    )
+
+
+def get_openai_client(api_key: str) -> "OpenAI":
+    """Return the shared client for this API key, building it on first use"""
+    client = _clients.get(api_key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(api_key)
+            if client is None:
+                client = _build_client(api_key)
+                _clients[api_key] = client
+    return client
+
+
+def close_openai_clients() -> None:
+    """Close every shared client and its connection pool"""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
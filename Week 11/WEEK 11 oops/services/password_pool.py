@@ -0,0 +1,113 @@
+# Password Pool Service
+# Runs bcrypt hashing and verification on a bounded worker pool instead of
+# the Streamlit script thread. At most PASSWORD_POOL_WORKERS hashes run at
+# once (bcrypt releases the GIL, so threads use every core), and at most
+# PASSWORD_POOL_MAX_PENDING more may wait. Anything beyond that is rejected
+# straight away with PoolOverloadedError, so a login burst can't queue up
+# unbounded CPU work and starve the other sessions.
+
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Dict, Optional
+
+import config
+from services import passwords
+
+
+class PoolOverloadedError(Exception):
+    """Raised when the hashing queue is full"""
+
+
+class PasswordPool:
+    def __init__(self, workers: int = config.PASSWORD_POOL_WORKERS,
+                 max_pending: int = config.PASSWORD_POOL_MAX_PENDING,
+                 kind: str = config.PASSWORD_POOL_KIND,
+                 timeout: float = config.PASSWORD_POOL_TIMEOUT):
+        executor_class = ProcessPoolExecutor if kind == "process" else ThreadPoolExecutor
+        self._executor = executor_class(max_workers=workers)
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._metrics_lock = threading.Lock()
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._in_flight = 0
+        self._total_seconds = 0.0
+
+    def _run(self, fn, *args) -> Any:
+        if not self._slots.acquire(blocking=False):
+            with self._metrics_lock:
+                self._rejected += 1
+            raise PoolOverloadedError("Too many password operations in progress")
+
+        with self._metrics_lock:
+            self._submitted += 1
+            self._in_flight += 1
+        start = time.perf_counter()
+        future = self._executor.submit(fn, *args)
+        # Free the slot when the work finishes, even if the caller gave up
+        future.add_done_callback(lambda _: self._release(start))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            with self._metrics_lock:
+                self._timed_out += 1
+            raise PoolOverloadedError("Password operation timed out")
+
+    def _release(self, start: float) -> None:
+        with self._metrics_lock:
+            self._in_flight -= 1
+            self._completed += 1
+            self._total_seconds += time.perf_counter() - start
+        self._slots.release()
+
+    def hash_password(self, password: str) -> str:
+        return self._run(passwords.hash_password, password, config.BCRYPT_ROUNDS)
+
+    def verify_password(self, password: str, password_hash: str) -> bool:
+        return self._run(passwords.verify_password, password, password_hash)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Counters for monitoring the pool"""
+        with self._metrics_lock:
+            average_ms = 1000 * self._total_seconds / self._completed if self._completed else 0.0
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "in_flight": self._in_flight,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+                "average_ms": average_ms,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+_pool: Optional[PasswordPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_password_pool() -> PasswordPool:
+    """Return the process-wide pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PasswordPool()
+    return _pool
+
+
+def hash_password(password: str) -> str:
+    return get_password_pool().hash_password(password)
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    return get_password_pool().verify_password(password, password_hash)
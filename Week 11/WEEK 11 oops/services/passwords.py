@@ -0,0 +1,74 @@
+# Password Service
+# bcrypt hashing with a configurable work factor (config.BCRYPT_ROUNDS),
+# calibration of that factor against a target verify time, and detection of
+# hashes made with a different cost so they can be upgraded at login.
+
+import time
+from typing import Dict, Iterable, Optional
+
+import config
+
+MIN_ROUNDS = 4
+MAX_ROUNDS = 16
+
+
+def hash_password(password: str, rounds: Optional[int] = None) -> str:
+    """Hash a password with the configured (or given) bcrypt cost"""
+    import bcrypt
+
+    rounds = config.BCRYPT_ROUNDS if rounds is None else rounds
+    return bcrypt.hashpw(
+        password.encode('utf-8'),
+        bcrypt.gensalt(rounds=rounds)
+    ).decode('utf-8')
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    """Check a password against a stored bcrypt hash"""
+    import bcrypt
+
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    except ValueError:
+        # Malformed hash in the database
+        return False
+
+
+def get_hash_rounds(password_hash: str) -> Optional[int]:
+    """Read the cost out of a '$2b$12$...' hash"""
+    parts = password_hash.split('$')
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """True if the hash was made with a different cost than configured"""
+    return get_hash_rounds(password_hash) != config.BCRYPT_ROUNDS
+
+
+def time_verify(rounds: int, samples: int = 3) -> float:
+    """Average seconds for one checkpw at the given cost"""
+    password_hash = hash_password("calibration-password", rounds)
+    start = time.perf_counter()
+    for _ in range(samples):
+        verify_password("calibration-password", password_hash)
+    return (time.perf_counter() - start) / samples
+
+
+def calibrate_rounds(target_ms: float = config.BCRYPT_TARGET_VERIFY_MS,
+                     min_rounds: int = 10, max_rounds: int = MAX_ROUNDS) -> int:
+    """Pick the highest cost whose verify time stays within target_ms.
+
+    Each extra round doubles the work, so stop as soon as one is too slow."""
+    chosen = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        if time_verify(rounds) * 1000 > target_ms:
+            break
+        chosen = rounds
+    return chosen
+
+
+def benchmark(rounds_range: Iterable[int], samples: int = 3) -> Dict[int, float]:
+    """Hashes verified per second, per core, for each cost"""
+    return {rounds: 1 / time_verify(rounds, samples) for rounds in rounds_range}
@@ -0,0 +1,60 @@
+# Preferences Service
+# Per-session cache of the logged in user's preferences. They are loaded
+# from the database once at login, pages read them from session_state, and
+# saving writes back only the keys that changed in a single batched upsert.
+
+import json
+
+import streamlit as st
+from models.preferences import get_preferences, save_preferences as save_preference_rows
+
+DEFAULT_PREFERENCES = {
+    "theme": "Auto",
+    "page_size": 25,
+    "email_notifications": True,
+    "security_alerts": True,
+    "system_updates": False,
+    "weekly_report": False,
+}
+
+
+def load_preferences(user_id):
+    """Load a user's saved preferences into the session (call at login)"""
+    preferences = dict(DEFAULT_PREFERENCES)
+    for key, value in get_preferences(user_id).items():
+        preferences[key] = json.loads(value)
+    st.session_state.preferences = preferences
+    st.session_state.saved_preferences = dict(preferences)
+    return preferences
+
+
+def clear_preferences():
+    """Drop the cached preferences (call at logout)"""
+    st.session_state.pop("preferences", None)
+    st.session_state.pop("saved_preferences", None)
+
+
+def get_preference(key):
+    """Read a preference for the current user without touching the database"""
+    if "preferences" not in st.session_state:
+        # Sessions that logged in before preferences were cached
+        load_preferences(st.session_state.user.id)
+    return st.session_state.preferences.get(key, DEFAULT_PREFERENCES.get(key))
+
+
+def save_preferences(updates):
+    """Save changed preferences for the current user.
+
+    Returns the list of keys that were actually written."""
+    if "preferences" not in st.session_state:
+        load_preferences(st.session_state.user.id)
+    saved = st.session_state.saved_preferences
+    changes = {key: value for key, value in updates.items() if saved.get(key) != value}
+
+    save_preference_rows(
+        st.session_state.user.id,
+        {key: json.dumps(value) for key, value in changes.items()}
+    )
+    st.session_state.preferences.update(changes)
+    saved.update(changes)
+    return list(changes)
@@ -0,0 +1,169 @@
+# User Provisioning Service
+# Creates many accounts at once, e.g. when a new team is onboarded.
+#
+# Rows are validated first, then the passwords are hashed on a process pool
+# (one bcrypt per core at a time), and all accounts go in with one
+# executemany in a single transaction. A bad row is reported with its line
+# number and reason, and the rest of the batch still goes in.
+#
+# Usage (from the project folder), with a CSV of username,password[,role]:
+#   python -m services.provisioning new_team.csv
+#   python -m services.provisioning new_team.csv --workers 8 --report failures.csv
+
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Optional, Tuple
+
+from database.db import connect_database
+from models.schema import create_users_table
+from services import passwords
+from services.user_service import VALID_ROLES
+from services.users_file import get_users_file_mirror
+
+# One IN (...) lookup per this many usernames, under SQLite's variable limit
+_LOOKUP_BATCH = 500
+
+
+def _validate(rows):
+    """Split (line, username, password, role) rows into valid ones and failures"""
+    valid, failures, seen = [], [], set()
+    for line, username, password, role in rows:
+        username = (username or "").strip()
+        role = (role or "user").strip().lower()
+        if len(username) < 3:
+            failures.append((line, username, "Username must be at least 3 characters"))
+        elif not password or len(password) < 6:
+            failures.append((line, username, "Password must be at least 6 characters"))
+        elif role not in VALID_ROLES:
+            failures.append((line, username, f"Unknown role '{role}'"))
+        elif username in seen:
+            failures.append((line, username, "Duplicate username in file"))
+        else:
+            seen.add(username)
+            valid.append((line, username, password, role))
+    return valid, failures
+
+
+def _existing_usernames(conn, usernames):
+    existing = set()
+    for start in range(0, len(usernames), _LOOKUP_BATCH):
+        batch = usernames[start:start + _LOOKUP_BATCH]
+        placeholders = ",".join("?" * len(batch))
+        existing.update(row[0] for row in conn.execute(
+            f"SELECT username FROM users WHERE username IN ({placeholders})", batch
+        ))
+    return existing
+
+
+def _drop_existing(conn, rows, failures):
+    existing = _existing_usernames(conn, [row[1] for row in rows])
+    kept = []
+    for row in rows:
+        if row[1] in existing:
+            failures.append((row[0], row[1], "Username already exists"))
+        else:
+            kept.append(row)
+    return kept
+
+
+def provision_users(rows: Iterable[Tuple[int, Optional[str], Optional[str], Optional[str]]],
+                    workers: Optional[int] = None) -> dict:
+    """Create accounts from (line, username, password, role) rows.
+
+    Any field but line may be None (a missing CSV cell), and is reported as
+    a failure like a blank one.
+
+    Returns {'created', 'failures', 'seconds', 'accounts_per_second'}, where
+    failures is a list of (line, username, reason)."""
+    started = time.perf_counter()
+    valid, failures = _validate(rows)
+
+    conn = connect_database()
+    try:
+        create_users_table(conn)
+        # Don't spend bcrypt time on names that are already taken
+        valid = _drop_existing(conn, valid, failures)
+
+        hashes = []
+        if valid:
+            workers = workers or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                hashes = list(pool.map(
+                    passwords.hash_password,
+                    [row[2] for row in valid],
+                    chunksize=max(1, len(valid) // (workers * 4))
+                ))
+
+        with conn:  # one transaction for the whole batch
+            conn.execute("BEGIN IMMEDIATE")
+            # Check again under the write lock, someone may have registered meanwhile
+            still_free = {row[1] for row in _drop_existing(conn, valid, failures)}
+            records = [
+                (username, password_hash, role)
+                for (_, username, _, role), password_hash in zip(valid, hashes)
+                if username in still_free
+            ]
+            conn.executemany(
+                "INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)",
+                records
+            )
+    finally:
+        conn.close()
+
+    mirror = get_users_file_mirror()
+    if mirror is not None:
+        for username, password_hash, role in records:
+            mirror.append(username, password_hash, role)
+
+    seconds = time.perf_counter() - started
+    failures.sort()
+    return {
+        'created': len(records),
+        'failures': failures,
+        'seconds': seconds,
+        'accounts_per_second': len(records) / seconds if seconds else 0.0,
+    }
+
+
+def read_users_csv(path):
+    """Read (line, username, password, role) rows from a CSV with a header row"""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        # DictReader's line_num is the physical line just read
+        return [
+            (reader.line_num, row.get("username"), row.get("password"), row.get("role"))
+            for row in reader
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create user accounts from a CSV file")
+    parser.add_argument("csv_file", help="CSV with a header row: username,password[,role]")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Hashing processes (default: one per core)")
+    parser.add_argument("--report", help="Write failed rows to this CSV file")
+    args = parser.parse_args()
+
+    result = provision_users(read_users_csv(args.csv_file), workers=args.workers)
+    print(f" Created {result['created']} users in {result['seconds']:.1f}s "
+          f"({result['accounts_per_second']:.1f}/s)")
+
+    if result['failures']:
+        print(f" {len(result['failures'])} rows failed:")
+        for line, username, reason in result['failures'][:20]:
+            print(f"   line {line}: {username or '(blank)'} - {reason}")
+        if args.report:
+            with open(args.report, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(["line", "username", "reason"])
+                writer.writerows(result['failures'])
+            print(f" Failures written to {args.report}")
+    return 1 if result['failures'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,314 @@
+# Login Rate Limiter
+# Token buckets for login attempts, one per username and one per client
+# (IP address), checked before any bcrypt work so that a flood of guesses
+# can't tie up the password pool.
+#
+# Each attempt takes a token from both buckets, and buckets refill at a
+# steady rate up to their burst size. An attempt the client bucket turns
+# away gives its username token back, so it costs the account nothing. The username bucket is checked first
+# and doesn't depend on the client, so changing addresses doesn't reset it.
+# The client is only taken from X-Forwarded-For when the request came
+# through one of LOGIN_TRUSTED_PROXIES (see client_address). Separately, a username that collects
+# LOGIN_LOCKOUT_FAILURES failed logins in a row is locked for
+# LOGIN_LOCKOUT_SECONDS. A successful login resets the failure count.
+#
+# State lives in a pluggable store (config.LOGIN_LIMIT_BACKEND):
+#   memory - per-process LRU dict, enough for a single server process.
+#   sqlite - one small SQLite file shared by every server process, updated
+#            with BEGIN IMMEDIATE so concurrent attempts can't both take
+#            the last token.
+
+import ipaddress
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence, Tuple, Union
+
+import config
+
+# (tokens, updated_at, failures, locked_until)
+State = Tuple[float, float, int, float]
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+class MemoryLimitStore:
+    def __init__(self, max_keys: int = config.LOGIN_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+
+    def update(self, key: str, fn: Callable[[Optional[State]], Tuple[State, object]]):
+        """Apply fn to the key's state atomically and return its result"""
+        with self._lock:
+            state, result = fn(self._states.get(key))
+            self._states[key] = state
+            self._states.move_to_end(key)
+            # Random usernames must not grow the dict forever, drop the
+            # least recently used keys (long idle buckets are full anyway)
+            while len(self._states) > self.max_keys:
+                self._states.popitem(last=False)
+            return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._states.clear()
+
+
+class SQLiteLimitStore:
+    def __init__(self, path: str = config.LOGIN_LIMIT_PATH,
+                 sweep_every: int = 1000, idle_seconds: float = 3600):
+        self.path = path
+        self.sweep_every = sweep_every
+        self.idle_seconds = idle_seconds
+        self._writes = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per process, opened on first use. Streamlit runs each
+        # rerun on a new thread, so it is shared between threads and only
+        # used while holding self._lock.
+        conn = self._conn
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS login_limits (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    failures INTEGER NOT NULL,
+                    locked_until REAL NOT NULL
+                )
+            """)
+            self._conn = conn
+        return conn
+
+    def update(self, key: str, fn: Callable[[Optional[State]], Tuple[State, object]]):
+        with self._lock:
+            conn = self._connection()
+            # Take the write lock up front so the read-modify-write is atomic
+            # across processes
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT tokens, updated_at, failures, locked_until FROM login_limits WHERE key = ?",
+                    (key,)
+                ).fetchone()
+                state, result = fn(tuple(row) if row else None)
+                conn.execute(
+                    "INSERT OR REPLACE INTO login_limits (key, tokens, updated_at, failures, locked_until) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, *state)
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self._writes += 1
+            sweep = self._writes % self.sweep_every == 0
+        if sweep:
+            self.delete_idle(self.idle_seconds)
+        return result
+
+    def delete_idle(self, older_than: float) -> None:
+        """Remove keys that haven't been touched for older_than seconds"""
+        with self._lock:
+            self._connection().execute(
+                "DELETE FROM login_limits WHERE updated_at < ? AND locked_until < ?",
+                (time.time() - older_than, time.time())
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection().execute("DELETE FROM login_limits")
+
+
+BACKENDS = {
+    "memory": MemoryLimitStore,
+    "sqlite": SQLiteLimitStore,
+}
+
+
+@dataclass(frozen=True)
+class BucketRule:
+    burst: int
+    per_minute: float
+
+    @property
+    def per_second(self) -> float:
+        return self.per_minute / 60.0
+
+
+@dataclass(frozen=True)
+class Decision:
+    allowed: bool
+    retry_after: float = 0.0
+    reason: str = ""
+
+    def message(self) -> str:
+        wait = max(1, int(self.retry_after + 0.999))
+        if self.reason == "locked":
+            return f"Too many failed logins for this account. Try again in {wait} seconds."
+        return f"Too many login attempts. Try again in {wait} seconds."
+
+
+ALLOWED = Decision(True)
+
+
+class LoginRateLimiter:
+    def __init__(self, store,
+                 user_rule: BucketRule = BucketRule(config.LOGIN_LIMIT_USER_BURST,
+                                                    config.LOGIN_LIMIT_USER_PER_MINUTE),
+                 client_rule: BucketRule = BucketRule(config.LOGIN_LIMIT_CLIENT_BURST,
+                                                      config.LOGIN_LIMIT_CLIENT_PER_MINUTE),
+                 lockout_failures: int = config.LOGIN_LOCKOUT_FAILURES,
+                 lockout_seconds: float = config.LOGIN_LOCKOUT_SECONDS):
+        self.store = store
+        self.user_rule = user_rule
+        self.client_rule = client_rule
+        self.lockout_failures = lockout_failures
+        self.lockout_seconds = lockout_seconds
+        self._counter_lock = threading.Lock()
+        self.counters = {
+            "allowed": 0,
+            "limited": 0,
+            "locked": 0,
+            "failures": 0,
+            "lockouts": 0,
+            "store_errors": 0,
+        }
+
+    def _count(self, name: str) -> None:
+        with self._counter_lock:
+            self.counters[name] += 1
+
+    def _update(self, key: str, fn, default):
+        try:
+            return self.store.update(key, fn)
+        except sqlite3.Error:
+            # A locked or broken limits file must not stop everyone logging in
+            self._count("store_errors")
+            return default
+
+    @staticmethod
+    def _user_key(username: str) -> str:
+        return f"user:{username.strip().lower()}"
+
+    @staticmethod
+    def _client_key(client: str) -> str:
+        return f"client:{client}"
+
+    def _take(self, key: str, rule: BucketRule, check_lock: bool) -> Decision:
+        def take(state):
+            now = time.time()
+            tokens, updated_at, failures, locked_until = state or (rule.burst, now, 0, 0.0)
+            if check_lock and locked_until > now:
+                return (tokens, updated_at, failures, locked_until), \
+                    Decision(False, locked_until - now, "locked")
+            tokens = min(rule.burst, tokens + (now - updated_at) * rule.per_second)
+            if tokens < 1:
+                retry = (1 - tokens) / rule.per_second if rule.per_second > 0 else self.lockout_seconds
+                return (tokens, now, failures, locked_until), Decision(False, retry, "limited")
+            return (tokens - 1, now, failures, locked_until), ALLOWED
+        return self._update(key, take, ALLOWED)
+
+    def _give_back(self, key: str, rule: BucketRule) -> None:
+        def give_back(state):
+            now = time.time()
+            tokens, updated_at, failures, locked_until = state or (rule.burst, now, 0, 0.0)
+            tokens = min(rule.burst, tokens + (now - updated_at) * rule.per_second + 1)
+            return (tokens, now, failures, locked_until), None
+        self._update(key, give_back, None)
+
+    def check(self, username: str, client: Optional[str] = None) -> Decision:
+        """Take a token for this attempt. Call before verifying the password."""
+        user_key = self._user_key(username)
+        decision = self._take(user_key, self.user_rule, check_lock=True)
+        if decision.allowed and client:
+            decision = self._take(self._client_key(client), self.client_rule, check_lock=False)
+            if not decision.allowed:
+                self._give_back(user_key, self.user_rule)
+        self._count("allowed" if decision.allowed else decision.reason)
+        return decision
+
+    def record_failure(self, username: str) -> None:
+        """Count a failed login, locking the username once the limit is reached"""
+        def fail(state):
+            now = time.time()
+            tokens, updated_at, failures, locked_until = state or (self.user_rule.burst, now, 0, 0.0)
+            failures += 1
+            locked = False
+            if failures >= self.lockout_failures:
+                locked_until = now + self.lockout_seconds
+                failures = 0
+                locked = True
+            return (tokens, updated_at, failures, locked_until), locked
+        self._count("failures")
+        if self._update(self._user_key(username), fail, False):
+            self._count("lockouts")
+
+    def record_success(self, username: str) -> None:
+        def reset(state):
+            now = time.time()
+            tokens, updated_at, _, _ = state or (self.user_rule.burst, now, 0, 0.0)
+            return (tokens, updated_at, 0, 0.0), None
+        self._update(self._user_key(username), reset, None)
+
+    def metrics(self) -> dict:
+        with self._counter_lock:
+            return dict(self.counters)
+
+
+def parse_networks(spec: str) -> Tuple[Network, ...]:
+    """Parse a comma-separated list of addresses or networks"""
+    return tuple(
+        ipaddress.ip_network(part.strip(), strict=False)
+        for part in spec.split(",") if part.strip()
+    )
+
+
+def _is_trusted(address: str, trusted: Sequence[Network]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted)
+
+
+def client_address(peer: Optional[str], forwarded_for: str,
+                   trusted: Sequence[Network]) -> Optional[str]:
+    """The client address to rate limit, None if it can't be told.
+
+    peer is the address the connection came from. X-Forwarded-For is only
+    used when peer is a trusted proxy, and then only the right-most hop that
+    isn't itself a trusted proxy counts: anything left of it was written by
+    the client and can be anything."""
+    if not peer or not _is_trusted(peer, trusted):
+        return peer or None
+    hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted(hop, trusted):
+            return hop
+    # Every hop is one of our proxies, fall back to the nearest one (the
+    # left-most could still have been written by the client)
+    return hops[-1] if hops else peer
+
+
+_limiter: Optional[LoginRateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_login_limiter() -> LoginRateLimiter:
+    """Return the process-wide limiter using the configured store"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                store = BACKENDS[config.LOGIN_LIMIT_BACKEND]()
+                _limiter = LoginRateLimiter(store)
+    return _limiter
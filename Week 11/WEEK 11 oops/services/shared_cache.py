@@ -0,0 +1,203 @@
+# Shared Cache Service
+# Cache for query results and AI responses that is shared by every
+# Streamlit server process on the machine, with a small in-process LRU (L1)
+# in front of it.
+#
+# Backends are pluggable (config.SHARED_CACHE_BACKEND):
+#   sqlite - one SQLite file in WAL mode. Each write is a single atomic
+#            INSERT OR REPLACE and reads go through SQLite's memory map.
+#   memory - per-process only, for development or single-worker setups.
+#
+# Callers pass the data version of the tables a value depends on, and it
+# becomes part of the key. A write in any process bumps the version, so
+# every process misses the old entries without being told to clear them.
+
+import hashlib
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import config
+
+_MISSING = object()
+
+
+class MemoryCacheBackend:
+    def __init__(self):
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        item = self._items.get(key)
+        if item is None or item[1] < time.time():
+            return None
+        return item[0]
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._lock:
+            self._items[key] = (value, time.time() + ttl)
+
+    def delete_expired(self) -> None:
+        now = time.time()
+        with self._lock:
+            for key in [k for k, (_, expires) in self._items.items() if expires < now]:
+                del self._items[key]
+
+
+class SQLiteCacheBackend:
+    def __init__(self, path: str = config.SHARED_CACHE_PATH,
+                 mmap_bytes: int = config.SHARED_CACHE_MMAP_BYTES):
+        self.path = path
+        self.mmap_bytes = mmap_bytes
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per process, opened on first use. Streamlit runs each
+        # rerun on a new thread, so it is shared between threads and only
+        # used while holding self._lock.
+        conn = self._conn
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute(f"PRAGMA mmap_size = {int(self.mmap_bytes)}")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            self._conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT value FROM cache_entries WHERE key = ? AND expires_at >= ?",
+                (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        # A single statement in autocommit mode, so readers in other
+        # processes see either the old entry or the new one, never a mix
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, sqlite3.Binary(value), time.time() + ttl)
+            )
+
+    def delete_expired(self) -> None:
+        with self._lock:
+            self._connection().execute(
+                "DELETE FROM cache_entries WHERE expires_at < ?", (time.time(),)
+            )
+
+
+BACKENDS = {
+    "sqlite": SQLiteCacheBackend,
+    "memory": MemoryCacheBackend,
+}
+
+
+class SharedCache:
+    def __init__(self, backend, l1_entries: int = config.SHARED_CACHE_L1_ENTRIES,
+                 default_ttl: float = config.SHARED_CACHE_TTL_SECONDS,
+                 sweep_every: int = 500):
+        self.backend = backend
+        self.l1_entries = l1_entries
+        self.default_ttl = default_ttl
+        self.sweep_every = sweep_every
+        self._l1 = OrderedDict()
+        self._l1_lock = threading.Lock()
+        self._writes = 0
+        self.hits = {"l1": 0, "shared": 0, "miss": 0}
+
+    @staticmethod
+    def make_key(namespace: str, version, parts) -> str:
+        """Build '<namespace>:<version>:<digest of parts>'"""
+        digest = hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()[:32]
+        version_text = ".".join(str(v) for v in version) if isinstance(version, tuple) else str(version)
+        return f"{namespace}:{version_text}:{digest}"
+
+    def _l1_get(self, key):
+        with self._l1_lock:
+            item = self._l1.get(key)
+            if item is None:
+                return _MISSING
+            value, expires_at = item
+            if expires_at < time.time():
+                del self._l1[key]
+                return _MISSING
+            self._l1.move_to_end(key)
+            return value
+
+    def _l1_set(self, key, value, ttl):
+        with self._l1_lock:
+            self._l1[key] = (value, time.time() + ttl)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.l1_entries:
+                self._l1.popitem(last=False)
+
+    def get_or_compute(self, namespace: str, version, parts, compute: Callable[[], Any],
+                       ttl: Optional[float] = None, use_l1: bool = True) -> Any:
+        """Return the cached value for (namespace, version, parts), computing it on a miss.
+
+        use_l1=False skips the in-process copy for callers that already keep
+        one (e.g. functions wrapped in st.cache_data)."""
+        ttl = self.default_ttl if ttl is None else ttl
+        key = self.make_key(namespace, version, parts)
+
+        if use_l1:
+            value = self._l1_get(key)
+            if value is not _MISSING:
+                self.hits["l1"] += 1
+                return value
+
+        try:
+            payload = self.backend.get(key)
+        except sqlite3.Error:
+            payload = None
+        if payload is not None:
+            self.hits["shared"] += 1
+            value = pickle.loads(payload)
+        else:
+            self.hits["miss"] += 1
+            value = compute()
+            self._store(key, value, ttl)
+
+        if use_l1:
+            self._l1_set(key, value, ttl)
+        return value
+
+    def _store(self, key, value, ttl):
+        try:
+            self.backend.set(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ttl)
+            self._writes += 1
+            if self._writes % self.sweep_every == 0:
+                self.backend.delete_expired()
+        except sqlite3.Error:
+            # The shared store is an optimisation, a locked or broken file
+            # must not break the page
+            pass
+
+
+_shared_cache: Optional[SharedCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache() -> SharedCache:
+    """Return the process-wide cache using the configured backend"""
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                backend = BACKENDS[config.SHARED_CACHE_BACKEND]()
+                _shared_cache = SharedCache(backend)
+    return _shared_cache
@@ -0,0 +1,156 @@
+# Snapshot Worker Service
+# One background thread per process keeps an immutable snapshot of the
+# dashboard and analytics aggregates (counts, breakdowns, monthly trends and
+# top-N lists). Pages read the latest snapshot instead of querying, so the
+# database load stays the same however many analysts are connected.
+#
+# The worker keeps one connection open and polls the data versions of the
+# entry tables (database.db.get_data_version), which every write to them
+# bumps, in this or another process. It recomputes when one of them
+# changes, and at least every SNAPSHOT_INTERVAL_SECONDS. Other writes (chat
+# messages, preferences, token revocations) don't trigger a recompute.
+
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
+
+import config
+from database.db import connect_database, get_data_version
+from models.summaries import get_platform_summary
+
+# Tables whose writes change the snapshot. The users count is only
+# refreshed every SNAPSHOT_INTERVAL_SECONDS.
+SNAPSHOT_TABLES = ('cyber_incidents', 'it_tickets', 'datasets_metadata')
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    return value
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    created_at: float
+    counts: Mapping[str, int]
+    breakdowns: Mapping[str, Mapping[str, int]]
+    average_dataset_size: Optional[float]
+    trends: Mapping[str, Any]
+    top: Mapping[str, Any]
+
+    @property
+    def age_seconds(self) -> float:
+        return time.time() - self.created_at
+
+    def describe_age(self) -> str:
+        age = int(self.age_seconds)
+        if age < 60:
+            return f"{age}s ago"
+        return f"{age // 60}m {age % 60}s ago"
+
+
+class SnapshotWorker:
+    def __init__(self, interval: float = config.SNAPSHOT_INTERVAL_SECONDS,
+                 poll: float = config.SNAPSHOT_POLL_SECONDS):
+        self.interval = interval
+        self.poll = poll
+        self._snapshot: Optional[Snapshot] = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def snapshot(self) -> Optional[Snapshot]:
+        return self._snapshot
+
+    def compute(self, conn: sqlite3.Connection) -> Optional[Snapshot]:
+        """Recompute the snapshot, keeping the previous one if the tables aren't ready"""
+        # Taken before reading, so a write made during the read is newer than the snapshot
+        created_at = time.time()
+        try:
+            summary = get_platform_summary(conn)
+        except sqlite3.Error:
+            return self._snapshot
+        snapshot = Snapshot(
+            created_at=created_at,
+            counts=_freeze(summary['counts']),
+            breakdowns=_freeze(summary['breakdowns']),
+            average_dataset_size=summary['average_dataset_size'],
+            trends=_freeze(summary['trends']),
+            top=_freeze(summary['top']),
+        )
+        # Swapping the reference is atomic, readers never see a partial snapshot
+        self._snapshot = snapshot
+        return snapshot
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="snapshot-worker", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def request_refresh(self) -> None:
+        """Recompute on the next loop instead of waiting for a change or the interval"""
+        self._wake.set()
+
+    def _run(self) -> None:
+        conn = connect_database()
+        try:
+            last_version = None
+            last_run = 0.0
+            while not self._stop.is_set():
+                try:
+                    version = get_data_version(*SNAPSHOT_TABLES)
+                    due = time.time() - last_run >= self.interval
+                    if version != last_version or due or self._wake.is_set():
+                        self._wake.clear()
+                        self.compute(conn)
+                        last_version = version
+                        last_run = time.time()
+                except Exception as e:
+                    # e.g. 'database is locked', try again on the next poll
+                    # rather than leave pages on a snapshot that never updates
+                    print(f"Snapshot refresh failed: {e}")
+                self._wake.wait(self.poll)
+        finally:
+            conn.close()
+
+
+_worker: Optional[SnapshotWorker] = None
+_worker_lock = threading.Lock()
+
+
+def get_snapshot_worker() -> SnapshotWorker:
+    """Return the process-wide worker, starting it on first use and restarting it if it died"""
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = SnapshotWorker()
+    _worker.start()
+    return _worker
+
+
+def latest_snapshot() -> Optional[Snapshot]:
+    """Latest snapshot, computed synchronously only if the worker has none yet"""
+    worker = get_snapshot_worker()
+    snapshot = worker.snapshot
+    if snapshot is None:
+        conn = connect_database()
+        try:
+            snapshot = worker.compute(conn)
+        finally:
+            conn.close()
+    return snapshot
@@ -0,0 +1,181 @@
+# Token Revocation Service
+# Revoked JWT ids (jti) live in the revoked_tokens table, so a logout in one
+# server process is seen by all of them, and each process keeps the
+# unexpired ones in a set for O(1) checks.
+#
+# Deleting or renaming an account must end all of its sessions, whose jtis
+# we don't know. The revoked_users table records a per-user cut-off
+# instead: every token of that user issued before revoked_before is
+# revoked. It is refreshed the same way as revoked_tokens.
+#
+# The set is topped up incrementally by one background thread per process:
+# rows are only ever appended (with an AUTOINCREMENT id), so a refresh
+# fetches just the rows after the last id seen, every
+# TOKEN_REVOCATION_REFRESH_SECONDS. Checks on the request path never touch
+# the database. Revocations made in this process go into the set straight
+# away. Rows for tokens that have expired anyway are deleted by a sweep
+# every TOKEN_REVOCATION_PRUNE_SECONDS.
+
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+import config
+from database.db import DB_PATH
+from models.schema import create_revoked_tokens_table, create_revoked_users_table
+
+
+class RevocationList:
+    def __init__(self, refresh_seconds: float = config.TOKEN_REVOCATION_REFRESH_SECONDS,
+                 prune_seconds: float = config.TOKEN_REVOCATION_PRUNE_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.prune_seconds = prune_seconds
+        self._revoked = {}  # jti -> expires_at
+        self._users = {}  # user_id -> (revoked_before, expires_at)
+        self._last_id = 0
+        self._last_user_id = 0
+        self._last_prune = time.time()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per process, shared by the request threads and the
+        # refresher and only used while holding self._lock. The table is
+        # created when it is first opened.
+        if self._conn is None:
+            conn = sqlite3.connect(str(DB_PATH), timeout=5, check_same_thread=False)
+            create_revoked_tokens_table(conn)
+            create_revoked_users_table(conn)
+            self._conn = conn
+        return self._conn
+
+    def revoke(self, jti: str, expires_at: float) -> None:
+        """Revoke a token id until expires_at (the token's exp)"""
+        with self._lock:
+            self._revoked[jti] = expires_at
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR IGNORE INTO revoked_tokens (jti, expires_at, revoked_at) VALUES (?, ?, ?)",
+                (jti, expires_at, time.time())
+            )
+            conn.commit()
+
+    def revoke_user(self, user_id: int, revoked_before: float, expires_at: float) -> None:
+        """Revoke every token of user_id issued before revoked_before.
+
+        expires_at is when the last of those tokens expires."""
+        with self._lock:
+            self._add_user(user_id, revoked_before, expires_at)
+            conn = self._connection()
+            conn.execute(
+                "INSERT INTO revoked_users (user_id, revoked_before, expires_at) VALUES (?, ?, ?)",
+                (user_id, revoked_before, expires_at)
+            )
+            conn.commit()
+
+    def _add_user(self, user_id: int, revoked_before: float, expires_at: float) -> None:
+        current = self._users.get(user_id)
+        if current is None or current[0] < revoked_before:
+            self._users[user_id] = (revoked_before, max(expires_at, current[1] if current else 0))
+
+    def is_revoked(self, jti: Optional[str], user_id: Optional[int] = None,
+                   issued_at: Optional[float] = None) -> bool:
+        if jti and jti in self._revoked:
+            return True
+        if user_id is None or issued_at is None:
+            return False
+        cut_off = self._users.get(user_id)
+        return cut_off is not None and issued_at < cut_off[0]
+
+    def refresh(self) -> None:
+        """Load revocations added by any process since the last refresh"""
+        now = time.time()
+        with self._lock:
+            try:
+                rows = self._connection().execute(
+                    "SELECT id, jti, expires_at FROM revoked_tokens WHERE id > ? ORDER BY id",
+                    (self._last_id,)
+                ).fetchall()
+            except sqlite3.Error:
+                # Keep what we have, a missed refresh is picked up by the next one
+                return
+            for row_id, jti, expires_at in rows:
+                if expires_at > now:
+                    self._revoked[jti] = expires_at
+                self._last_id = row_id
+            try:
+                rows = self._connection().execute(
+                    "SELECT id, user_id, revoked_before, expires_at FROM revoked_users WHERE id > ? ORDER BY id",
+                    (self._last_user_id,)
+                ).fetchall()
+            except sqlite3.Error:
+                return
+            for row_id, user_id, revoked_before, expires_at in rows:
+                if expires_at > now:
+                    self._add_user(user_id, revoked_before, expires_at)
+                self._last_user_id = row_id
+        if now - self._last_prune >= self.prune_seconds:
+            self.prune()
+
+    def prune(self) -> None:
+        """Forget revocations of tokens that have expired on their own"""
+        now = time.time()
+        with self._lock:
+            for jti in [jti for jti, expires_at in self._revoked.items() if expires_at <= now]:
+                del self._revoked[jti]
+            for user_id in [user_id for user_id, (_, expires_at) in self._users.items() if expires_at <= now]:
+                del self._users[user_id]
+            self._last_prune = now
+            try:
+                conn = self._connection()
+                conn.execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (now,))
+                conn.execute("DELETE FROM revoked_users WHERE expires_at <= ?", (now,))
+                conn.commit()
+            except sqlite3.Error:
+                pass
+
+    def start(self) -> None:
+        """Start the refresher thread, or restart it if it has died"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="token-revocation", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.refresh_seconds):
+            try:
+                self.refresh()
+            except Exception as e:
+                # Keep refreshing, one bad round must not stop revocations
+                # from other processes being picked up
+                print(f"Token revocation refresh failed: {e}")
+
+    def __len__(self) -> int:
+        return len(self._revoked) + len(self._users)
+
+
+_revocation_list: Optional[RevocationList] = None
+_revocation_lock = threading.Lock()
+
+
+def get_revocation_list() -> RevocationList:
+    """Return the process-wide revocation list, loading it on first use"""
+    global _revocation_list
+    if _revocation_list is None:
+        with _revocation_lock:
+            if _revocation_list is None:
+                revocation_list = RevocationList()
+                revocation_list.refresh()
+                revocation_list.start()
+                _revocation_list = revocation_list
+    return _revocation_list
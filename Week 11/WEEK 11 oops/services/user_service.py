@@ -1,76 +1,269 @@
-import bcrypt
+import json
+import sqlite3
+import time
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
 from database.db import connect_database
-from models.users import get_user_by_username, insert_user
+from models.users import get_user_by_username, get_user_by_id, insert_user, update_password_hash
 from models.schema import create_users_table
+from services.passwords import needs_rehash, get_hash_rounds
+from services.password_pool import hash_password, verify_password, PoolOverloadedError
+from services.rate_limiter import get_login_limiter
+from services.users_file import get_users_file_mirror
+
+BUSY_MESSAGE = "The server is busy, please try again in a moment."
+
+
+@dataclass(frozen=True, slots=True)
+class UserRecord:
+    """The logged in user, kept in the session so pages don't look it up again"""
+    id: int
+    username: str
+    role: str
+    hash_cost: Optional[int]
+
+
+def _to_record(row, password_hash=None):
+    user_id, username, stored_hash, role = row
+    return UserRecord(user_id, username, role, get_hash_rounds(password_hash or stored_hash))
+
+
+def get_user_record(user_id):
+    """Look up a user's record by id, None if the account doesn't exist"""
+    row = get_user_by_id(user_id)
+    return _to_record(row) if row else None
 
 
 def register_user(username, password, role='user'):
-    user_exists = get_user_by_username(username)
-    if user_exists:
-        return False, f"Username '{username}' already exists."
+    try:
+        password_hash = hash_password(password)
+    except PoolOverloadedError:
+        return False, BUSY_MESSAGE
     
-    password_hash = bcrypt.hashpw(
-        password.encode('utf-8'),
-        bcrypt.gensalt()
-    ).decode('utf-8')
-    
-    insert_user(username, password_hash, role)
+    # One INSERT, the UNIQUE constraint on username catches duplicates
+    # (including two people registering the same name at once)
+    try:
+        insert_user(username, password_hash, role)
+    except sqlite3.IntegrityError:
+        return False, f"Username '{username}' already exists."
     
-    # Append to users.txt
-    users_file = Path('DATA/users.txt')
-    users_file.parent.mkdir(parents=True, exist_ok=True)
-    with open(users_file, 'a') as f:
-        f.write(f"{username},{password_hash}\n")
+    # Mirror to users.txt in the background
+    mirror = get_users_file_mirror()
+    if mirror is not None:
+        mirror.append(username, password_hash, role)
     
     return True, f"User '{username}' registered successfully!"
 
 
-def login_user(username, password):
+def login_user(username, password, client=None):
+    """Returns (True, UserRecord) on success, (False, error message) otherwise"""
+    # Rate limit before touching the database or bcrypt
+    limiter = get_login_limiter()
+    decision = limiter.check(username, client)
+    if not decision.allowed:
+        return False, decision.message()
+    
     user = get_user_by_username(username)
     if not user:
+        limiter.record_failure(username)
         return False, "User not found."
     
     stored_hash = user[2]
-    role = user[3]
-    if bcrypt.checkpw(password.encode('utf-8'), stored_hash.encode('utf-8')):
-        return True, role
-    else:
+    try:
+        valid = verify_password(password, stored_hash)
+    except PoolOverloadedError:
+        return False, BUSY_MESSAGE
+    
+    if not valid:
+        limiter.record_failure(username)
         return False, "Incorrect password."
+    
+    limiter.record_success(username)
+    
+    # Upgrade hashes made with an older (or newer) cost while we have the password
+    if needs_rehash(stored_hash):
+        try:
+            new_hash = hash_password(password)
+            update_password_hash(user[0], new_hash)
+            stored_hash = new_hash
+        except PoolOverloadedError:
+            pass  # Keep the old hash, it is upgraded on a later login
+    return True, _to_record(user, stored_hash)
+
 
+VALID_ROLES = ('user', 'analyst', 'admin')
 
-def migrate_users_from_file(filepath='DATA/users.txt'):
+
+def _parse_log_record(line):
+    """Parse a Week 7 log record into (seq, op, username, password_hash), None if malformed"""
+    try:
+        record = json.loads(line)
+        seq, op, username = record['seq'], record['op'], record['user']
+    except (ValueError, KeyError, TypeError):
+        return None
+    password_hash = record.get('hash')
+    if not isinstance(seq, int) or not isinstance(username, str) or not username:
+        return None
+    if op == 'del':
+        return seq, op, username, None
+    if op == 'put' and isinstance(password_hash, str) and password_hash.startswith('$2'):
+        return seq, op, username, password_hash
+    return None
+
+
+def _parse_user_lines(lines, default_role):
+    """Yield (line_number, line, record) for each non-blank line.
+
+    record is (seq, op, username, password_hash, role), with seq -1 for a
+    plain 'username,password_hash[,role]' line, or None if the line is
+    malformed."""
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('{'):
+            parsed = _parse_log_record(line)
+            yield line_number, line, parsed + (default_role,) if parsed else None
+            continue
+        parts = line.split(',')
+        record = None
+        if len(parts) in (2, 3):
+            username, password_hash = parts[0].strip(), parts[1].strip()
+            role = parts[2].strip().lower() if len(parts) == 3 else default_role
+            if username and password_hash.startswith('$2') and role in VALID_ROLES:
+                record = (-1, 'put', username, password_hash, role)
+        yield line_number, line, record
+
+
+# Staging table for one migration, in SQLite's temp database (on disk once
+# it outgrows the page cache), so the Week 7 log can be replayed without
+# holding every username in memory
+_CREATE_IMPORT_TABLE = """
+    CREATE TEMP TABLE IF NOT EXISTS user_import (
+        username TEXT PRIMARY KEY,
+        seq INTEGER NOT NULL,
+        op TEXT NOT NULL,
+        password_hash TEXT,
+        role TEXT NOT NULL
+    )
+"""
+
+# A plain line keeps the first entry for a name (seq -1), a log record
+# replaces whatever is staged unless that has a higher seq
+_STAGE_RECORD = """
+    INSERT INTO user_import (seq, op, username, password_hash, role)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (username) DO UPDATE SET
+        seq = excluded.seq, op = excluded.op, password_hash = excluded.password_hash,
+        role = excluded.role
+    WHERE excluded.seq > user_import.seq
+"""
+
+
+def migrate_users_from_file(filepath='DATA/users.txt', chunk_size=5000,
+                            default_role='user', reject_path=None, progress=None):
+    """Stream 'username,password_hash[,role]' lines into the users table.
+
+    Lines are read lazily and staged in a temporary table with executemany,
+    one transaction per chunk, then copied into users a chunk at a time,
+    so memory use doesn't grow with the file. Malformed lines go to
+    reject_path (default '<file>.rejects'). Usernames already in the table
+    are skipped. progress, if given, is called with the stats after each
+    chunk. Returns the stats dict, or 0 if the file doesn't exist.
+
+    Files written by the Week 7 app are a JSON-lines log of
+    {"seq", "op": "put"|"del", "user", "hash"} records, possibly after some
+    plain lines. Staging replays them: the highest seq per username wins,
+    a log record overrides a plain line for the same name, and users whose
+    latest record is a put are inserted with default_role. Superseded and
+    deleted entries are counted in stats['superseded']."""
     filepath = Path(filepath)
     if not filepath.exists():
         print(f"File not found: {filepath}")
         return 0
     
+    reject_path = Path(reject_path) if reject_path else filepath.with_name(filepath.name + '.rejects')
+    stats = {'lines': 0, 'migrated': 0, 'skipped': 0, 'rejected': 0, 'superseded': 0,
+             'seconds': 0.0, 'rows_per_second': 0.0}
+    started = time.perf_counter()
+    
     conn = connect_database()
-    cursor = conn.cursor()
-    migrated_count = 0
+    create_users_table(conn)
+    conn.execute(_CREATE_IMPORT_TABLE)
+    conn.execute("DELETE FROM user_import")
+    rejects = None
+    chunk = []
+    staged = 0
+    
+    def report():
+        stats['seconds'] = time.perf_counter() - started
+        stats['rows_per_second'] = stats['migrated'] / stats['seconds'] if stats['seconds'] else 0.0
+        if progress:
+            progress(dict(stats))
+    
+    def stage():
+        # Log records in seq order, so the upsert keeps the latest one
+        chunk.sort(key=lambda record: record[0])
+        with conn:  # one transaction per chunk
+            conn.executemany(_STAGE_RECORD, chunk)
+        chunk.clear()
+        report()
     
-    with open(filepath, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            
-            parts = line.split(',')
-            if len(parts) >= 2:
-                username = parts[0]
-                password_hash = parts[1]
-                
-                try:
-                    cursor.execute(
-                        "INSERT OR IGNORE INTO users (username, password_hash, role) VALUES (?, ?, ?)",
-                        (username, password_hash, 'user')
-                    )
-                    if cursor.rowcount > 0:
-                        migrated_count += 1
-                except Exception as e:
-                    print(f"Error migrating {username}: {e}")
+    try:
+        with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
+            for line_number, line, record in _parse_user_lines(f, default_role):
+                stats['lines'] += 1
+                if record is None:
+                    if rejects is None:
+                        rejects = open(reject_path, 'w', encoding='utf-8')
+                    rejects.write(f"{line_number}: {line}\n")
+                    stats['rejected'] += 1
+                    continue
+                staged += 1
+                chunk.append(record)
+                if len(chunk) >= chunk_size:
+                    stage()
+        if chunk:
+            stage()
+        
+        # Plain lines in file order, then log records oldest first, as they
+        # were registered. Keyset paging on (seq, rowid) keeps each chunk a
+        # short write transaction.
+        winners = 0
+        last = (-2, 0)
+        while True:
+            rows = conn.execute("""
+                SELECT seq, rowid, username, password_hash, role FROM user_import
+                WHERE op = 'put' AND (seq, rowid) > (?, ?)
+                ORDER BY seq, rowid
+                LIMIT ?
+            """, (*last, chunk_size)).fetchall()
+            if not rows:
+                break
+            last = rows[-1][:2]
+            winners += len(rows)
+            before = conn.total_changes
+            with conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO users (username, password_hash, role) VALUES (?, ?, ?)",
+                    [row[2:] for row in rows]
+                )
+            inserted = conn.total_changes - before
+            stats['migrated'] += inserted
+            stats['skipped'] += len(rows) - inserted
+            report()
+        stats['superseded'] = staged - winners
+    finally:
+        if rejects is not None:
+            rejects.close()
+        conn.execute("DROP TABLE IF EXISTS temp.user_import")
+        conn.close()
     
-    conn.commit()
-    conn.close()
-    print(f" Migrated {migrated_count} users")
-    return migrated_count
+    stats['seconds'] = time.perf_counter() - started
+    stats['rows_per_second'] = stats['migrated'] / stats['seconds'] if stats['seconds'] else 0.0
+    print(f" Migrated {stats['migrated']} users ({stats['skipped']} already present, "
+          f"{stats['superseded']} superseded, {stats['rejected']} rejected) in {stats['seconds']:.1f}s")
+    if stats['rejected']:
+        print(f" Rejected lines written to {reject_path}")
+    return stats
@@ -0,0 +1,85 @@
+# Users File Mirror
+# Keeps the legacy DATA/users.txt file ("username,password_hash,role" per
+# line, so migrating it again keeps admins admins) in step with registrations without putting file I/O on the request path.
+#
+# register_user only puts the line on a queue. One background thread per
+# process drains everything queued so far and writes it with a single open
+# and write, so a burst of sign-ups becomes one append. Set
+# USERS_FILE_MIRROR=0 to stop writing the file altogether.
+
+import atexit
+import queue
+import threading
+from pathlib import Path
+from typing import Optional
+
+import config
+
+_STOP = object()
+
+
+class UsersFileMirror:
+    def __init__(self, path: str = config.USERS_FILE_PATH,
+                 batch_size: int = config.USERS_FILE_BATCH):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, name="users-file-mirror", daemon=True
+        )
+        self._thread.start()
+        self.written = 0
+        self.errors = 0
+
+    def append(self, username: str, password_hash: str, role: str) -> None:
+        """Queue a line for the file, returns immediately"""
+        self._queue.put(f"{username},{password_hash},{role}\n")
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write everything still queued and stop the thread"""
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            lines = [self._queue.get()]
+            # Take whatever else is already waiting, up to one batch
+            while len(lines) < self.batch_size:
+                try:
+                    lines.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in lines:
+                stopping = True
+                lines = [line for line in lines if line is not _STOP]
+            if lines:
+                self._write(lines)
+
+    def _write(self, lines) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a') as f:
+                f.write("".join(lines))
+            self.written += len(lines)
+        except OSError as e:
+            # The database is the source of truth, the mirror is best effort
+            self.errors += len(lines)
+            print(f"Could not write {self.path}: {e}")
+
+
+_mirror: Optional[UsersFileMirror] = None
+_mirror_lock = threading.Lock()
+
+
+def get_users_file_mirror() -> Optional[UsersFileMirror]:
+    """Return the process-wide mirror, or None when USERS_FILE_MIRROR is off"""
+    global _mirror
+    if not config.USERS_FILE_MIRROR:
+        return None
+    if _mirror is None:
+        with _mirror_lock:
+            if _mirror is None:
+                _mirror = UsersFileMirror()
+                atexit.register(_mirror.close)
+    return _mirror
@@ -0,0 +1,39 @@
+from services.rate_limiter import (
+    BucketRule, LoginRateLimiter, MemoryLimitStore, client_address, parse_networks
+)
+
+TRUSTED = parse_networks("10.0.0.0/8")
+
+
+def make_limiter(user_burst=5, client_burst=5):
+    # per_minute=0 so buckets don't refill during the test
+    return LoginRateLimiter(MemoryLimitStore(), BucketRule(user_burst, 0), BucketRule(client_burst, 0))
+
+
+def test_untrusted_peer_ignores_forwarded_for():
+    assert client_address("203.0.113.5", "198.51.100.1", TRUSTED) == "203.0.113.5"
+
+
+def test_right_most_untrusted_hop_is_the_client():
+    forwarded = "198.51.100.1, 203.0.113.7, 10.0.0.2"
+    assert client_address("10.0.0.1", forwarded, TRUSTED) == "203.0.113.7"
+
+
+def test_all_trusted_chain_uses_the_nearest_hop():
+    forwarded = "10.9.9.9, 10.0.0.3, 10.0.0.2"
+    assert client_address("10.0.0.1", forwarded, TRUSTED) == "10.0.0.2"
+
+
+def test_all_trusted_without_forwarded_for_uses_the_peer():
+    assert client_address("10.0.0.1", "", TRUSTED) == "10.0.0.1"
+
+
+def test_client_rejection_gives_the_user_token_back():
+    limiter = make_limiter(user_burst=2, client_burst=1)
+    assert limiter.check("alice", "203.0.113.5").allowed
+    for _ in range(5):
+        decision = limiter.check("alice", "203.0.113.5")
+        assert not decision.allowed and decision.reason == "limited"
+    # Only the one allowed attempt took an alice token
+    assert limiter.check("alice", "203.0.113.6").allowed
+    assert not limiter.check("alice", "203.0.113.7").allowed
@@ -1,10 +1,21 @@
 # auth.py
 # Week 7 - Secure Authentication System (CST1510)
 # Implements: password hashing (bcrypt), registration, login, validation, simple menu
+#
+# users.txt is an append-only log with one JSON record per line:
+#   {"seq":3,"op":"put","user":"alice","hash":"$2b$12$..."}   register / new password
+#   {"seq":4,"op":"del","user":"alice"}                        delete (tombstone)
+# The record with the highest seq for a username wins. Plain
+# "username,hash" lines from the original format are still read.
+# Run `python "Week 7.py" compact` to rewrite the file with live users only.
+# The Week 11 importer (migrate_users_from_file in services/user_service.py)
+# replays this log, so a Week 7 users.txt can still be migrated as is.
 
 import bcrypt
+import json
 import os
 import re
+import sys
 
 USER_DATA_FILE = "users.txt"
 
@@ -50,6 +61,149 @@ def _ensure_user_file_exists():
             pass  # create empty file
 
 
+class UserIndex:
+    """
+    In-memory index of users.txt: a dict of username -> (seq, hashed password),
+    built by replaying the log. The file is read once; after that only
+    records appended since the last read are parsed. The file's size, mtime
+    and inode are tracked so that a rewritten or truncated file (e.g. after
+    compaction) triggers a full reload instead.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._users = {}
+        self._seen = set()      # usernames with any JSON record, live or deleted
+        self.last_seq = 0
+        self.records = 0        # records replayed, live or not
+        self._offset = 0        # bytes of the file already parsed
+        self._stat_key = None   # (inode, size, mtime_ns) at the last refresh
+
+    def _reset(self):
+        self._users, self._seen = {}, set()
+        self.last_seq, self.records, self._offset = 0, 0, 0
+
+    def refresh(self):
+        """Bring the index up to date with the file (cheap if nothing changed)."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._reset()
+            self._stat_key = None
+            return
+        stat_key = (st.st_ino, st.st_size, st.st_mtime_ns)
+        if stat_key == self._stat_key:
+            return
+        appended_only = (
+            self._stat_key is not None
+            and st.st_ino == self._stat_key[0]
+            and st.st_size > self._offset
+        )
+        if not appended_only:
+            # First load, or the file was replaced, truncated or edited in place
+            self._reset()
+        self._read_from(self._offset)
+        self._stat_key = stat_key
+
+    def _read_from(self, offset):
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        # Only parse complete lines; a partly written last line is picked up next time
+        end = data.rfind(b"\n") + 1
+        for raw in data[:end].splitlines():
+            line = raw.decode("utf-8", errors="replace").strip()
+            if line:
+                self._apply(line)
+        self._offset = offset + end
+
+    def _apply(self, line):
+        if not line.startswith("{"):
+            # Original format: username,hashed_password. First entry wins,
+            # as with the old top-to-bottom scan, and log records override it.
+            parts = line.split(",", 1)
+            if len(parts) == 2 and parts[0] not in self._seen and parts[0] not in self._users:
+                self._users[parts[0]] = (0, parts[1])
+                self.records += 1
+            return
+        try:
+            record = json.loads(line)
+            seq, op, username = record["seq"], record["op"], record["user"]
+        except (ValueError, KeyError, TypeError):
+            return  # skip a damaged record rather than refuse to start
+        hashed = record.get("hash")
+        if not isinstance(seq, int) or not isinstance(username, str) or not username:
+            return
+        if op not in ("put", "del") or (op == "put" and not isinstance(hashed, str)):
+            return
+        self.records += 1
+        self.last_seq = max(self.last_seq, seq)
+        self._seen.add(username)
+        current = self._users.get(username)
+        if current is not None and current[0] > seq:
+            return
+        if op == "put":
+            self._users[username] = (seq, hashed)
+        elif op == "del":
+            self._users.pop(username, None)
+
+    def get(self, username):
+        """Return the stored hash for username, or None."""
+        self.refresh()
+        entry = self._users.get(username)
+        return entry[1] if entry else None
+
+    def live_users(self):
+        """Return {username: (seq, hash)} for users that are not deleted."""
+        self.refresh()
+        return dict(self._users)
+
+    def __len__(self):
+        self.refresh()
+        return len(self._users)
+
+
+def _encode_record(seq, op, username, hashed=None):
+    record = {"seq": seq, "op": op, "user": username}
+    if hashed is not None:
+        record["hash"] = hashed
+    return json.dumps(record, separators=(",", ":")) + "\n"
+
+
+def _append_record(op, username, hashed=None):
+    """Append one record to the log (O(1), no rewrite) and update the index."""
+    _ensure_user_file_exists()
+    _user_index.refresh()
+    line = _encode_record(_user_index.last_seq + 1, op, username, hashed)
+    with open(USER_DATA_FILE, "a", encoding="utf-8") as f:
+        f.write(line)
+    _user_index.refresh()  # tails just the record written above
+
+
+def compact_user_file():
+    """
+    Rewrite users.txt with one record per live user, dropping deleted users
+    and old passwords. The new file is written next to the old one and
+    swapped in with os.replace, so a crash never leaves a half-written file.
+    Returns (records_before, records_after).
+    """
+    _ensure_user_file_exists()
+    live = _user_index.live_users()
+    before = _user_index.records
+    tmp_path = USER_DATA_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for username, (seq, hashed) in sorted(live.items(), key=lambda item: item[1][0]):
+            f.write(_encode_record(seq, "put", username, hashed))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, USER_DATA_FILE)
+    _user_index.refresh()  # new inode, so this is a full (now short) replay
+    return before, len(live)
+
+
+_user_index = UserIndex(USER_DATA_FILE)
+
+
 def user_exists(username):
     """
     Return True if username exists in users.txt, False otherwise.
@@ -57,17 +211,7 @@ def user_exists(username):
     """
     if not isinstance(username, str) or username.strip() == "":
         return False
-    _ensure_user_file_exists()
-    with open(USER_DATA_FILE, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            # format: username,hashed_password
-            parts = line.split(",", 1)
-            if len(parts) >= 1 and parts[0] == username:
-                return True
-    return False
+    return _user_index.get(username) is not None
 
 
 def register_user(username, password):
@@ -80,9 +224,7 @@ def register_user(username, password):
 
     # Hash the password and append to file
     hashed = hash_password(password)
-    _ensure_user_file_exists()
-    with open(USER_DATA_FILE, "a", encoding="utf-8") as f:
-        f.write(f"{username},{hashed}\n")
+    _append_record("put", username, hashed)
     return True, f"Success: User '{username}' registered successfully!"
 
 
@@ -91,26 +233,38 @@ def login_user(username, password):
     Authenticate username and password against the file.
     Returns (True, message) if successful, (False, message) otherwise.
     """
-    if not user_exists(username):
+    if not isinstance(username, str) or username.strip() == "":
         return False, "Error: Username not found."
+    stored_hash = _user_index.get(username)
+    if stored_hash is None:
+        return False, "Error: Username not found."
+    if verify_password(password, stored_hash):
+        return True, f"Success: Welcome, {username}!"
+    return False, "Error: Invalid password."
 
-    # Search for the username and verify password
-    with open(USER_DATA_FILE, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            parts = line.split(",", 1)
-            if len(parts) < 2:
-                continue
-            stored_username, stored_hash = parts[0], parts[1]
-            if stored_username == username:
-                if verify_password(password, stored_hash):
-                    return True, f"Success: Welcome, {username}!"
-                else:
-                    return False, "Error: Invalid password."
-    # should not reach here if user_exists returned True, but safe fallback:
-    return False, "Error: Username not found."
+
+def change_password(username, old_password, new_password):
+    """
+    Change a user's password by appending a new record.
+    Returns (True, message) on success, (False, message) on failure.
+    """
+    success, msg = login_user(username, old_password)
+    if not success:
+        return False, msg
+    _append_record("put", username, hash_password(new_password))
+    return True, "Success: Password changed."
+
+
+def delete_user(username, password):
+    """
+    Delete a user by appending a tombstone record.
+    Returns (True, message) on success, (False, message) on failure.
+    """
+    success, msg = login_user(username, password)
+    if not success:
+        return False, msg
+    _append_record("del", username)
+    return True, f"Success: User '{username}' deleted."
 
 
 # ---------------------------
@@ -162,7 +316,9 @@ def display_menu():
     print("=" * 50)
     print("\n[1] Register a new user")
     print("[2] Login")
-    print("[3] Exit")
+    print("[3] Change password")
+    print("[4] Delete account")
+    print("[5] Exit")
     print("-" * 50)
 
 
@@ -171,7 +327,7 @@ def main():
     while True:
         try:
             display_menu()
-            choice = input("\nPlease select an option (1-3): ").strip()
+            choice = input("\nPlease select an option (1-5): ").strip()
             if choice == '1':
                 # Registration flow
                 print("\n--- USER REGISTRATION ---")
@@ -207,11 +363,34 @@ def main():
                     input("\nPress Enter to return to the main menu...")
 
             elif choice == '3':
+                print("\n--- CHANGE PASSWORD ---")
+                username = input("Enter your username: ").strip()
+                old_password = input("Enter your current password: ").strip()
+                new_password = input("Enter a new password: ").strip()
+                is_valid, error_msg = validate_password(new_password)
+                if not is_valid:
+                    print(f"Error: {error_msg}")
+                    continue
+                success, msg = change_password(username, old_password, new_password)
+                print(msg)
+
+            elif choice == '4':
+                print("\n--- DELETE ACCOUNT ---")
+                username = input("Enter your username: ").strip()
+                password = input("Enter your password: ").strip()
+                confirm = input(f"Type '{username}' to confirm deletion: ").strip()
+                if confirm != username:
+                    print("Error: Confirmation did not match.")
+                    continue
+                success, msg = delete_user(username, password)
+                print(msg)
+
+            elif choice == '5':
                 print("\nThank you for using the authentication system. Exiting...")
                 break
 
             else:
-                print("\nError: Invalid option. Please select 1, 2, or 3.")
+                print("\nError: Invalid option. Please select 1-5.")
         except KeyboardInterrupt:
             print("\n\nInterrupted by user. Exiting...")
             break
@@ -222,4 +401,8 @@ def main():
 
 # Allow running as a script
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if sys.argv[1:] == ["compact"]:
+        before, after = compact_user_file()
+        print(f"Compacted {USER_DATA_FILE}: {before} records -> {after} live users.")
+    else:
+        main()
\ No newline at end of file